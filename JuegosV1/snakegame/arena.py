@@ -0,0 +1,273 @@
+"""Arena mode: many snakes on one big wrap-around board.
+
+Same rules as snakeV4.7 (wrap at the edges, grow when eating, die when the
+head runs into a body) but with hundreds or thousands of snakes and lots of
+food.  A shared occupancy grid holds the owner of every cell, so a tick only
+looks at the cells the heads move into and the work per tick grows with the
+number of snakes, not with their total length.  Dead snakes turn into food.
+
+    python arena.py                 play against the bots (WASD / arrows)
+    python arena.py --bench         headless benchmark, 1000 snakes
+"""
+import argparse
+import random
+import sys
+import time
+from array import array
+from collections import deque
+
+EMPTY = -1
+FOOD = -2
+
+# UP, DOWN, LEFT, RIGHT as in snakeV4.7
+DIRECTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
+MOVES = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+OPPOSITE = [1, 0, 3, 2]
+# left and right turns for each direction
+TURNS = [(2, 3), (2, 3), (0, 1), (0, 1)]
+
+
+class Snake:
+    __slots__ = ("id", "body", "direction", "alive", "player", "score", "respawn_at")
+
+    def __init__(self, snake_id, player=False):
+        self.id = snake_id
+        self.body = deque()
+        self.direction = 3
+        self.alive = False
+        self.player = player
+        self.score = 0
+        self.respawn_at = 0
+
+
+class Arena:
+    def __init__(self, cols, rows, food_target=None, respawn_ticks=30, seed=None):
+        self.cols = cols
+        self.rows = rows
+        self.size = cols * rows
+        self.grid = array('i', [EMPTY]) * self.size
+        self.snakes = []
+        self.food_count = 0
+        self.food_target = food_target if food_target is not None else self.size // 100
+        self.respawn_ticks = respawn_ticks
+        self.random = random.Random(seed)
+        self.tick_count = 0
+        self.spawn_food()
+
+    # -- setup ---------------------------------------------------------
+    def add_snake(self, player=False):
+        snake = Snake(len(self.snakes), player)
+        self.snakes.append(snake)
+        self.place(snake)
+        return snake
+
+    def place(self, snake):
+        """Drop a one-cell snake on a random empty cell."""
+        grid = self.grid
+        for _ in range(100):
+            cell = self.random.randrange(self.size)
+            if grid[cell] == EMPTY:
+                break
+        else:
+            snake.respawn_at = self.tick_count + self.respawn_ticks
+            return
+        grid[cell] = snake.id
+        snake.body.clear()
+        snake.body.append(cell)
+        snake.direction = self.random.randrange(4)
+        snake.alive = True
+        snake.score = 0
+
+    def spawn_food(self):
+        grid = self.grid
+        size = self.size
+        randrange = self.random.randrange
+        tries = 0
+        while self.food_count < self.food_target and tries < 4 * self.food_target:
+            tries += 1
+            cell = randrange(size)
+            if grid[cell] == EMPTY:
+                grid[cell] = FOOD
+                self.food_count += 1
+
+    # -- rules ---------------------------------------------------------
+    def step_cell(self, cell, direction):
+        x = cell % self.cols
+        y = cell // self.cols
+        dx, dy = MOVES[direction]
+        return (y + dy) % self.rows * self.cols + (x + dx) % self.cols
+
+    def set_direction(self, snake, direction):
+        direction = DIRECTIONS.index(direction)
+        if direction != OPPOSITE[snake.direction]:
+            snake.direction = direction
+
+    def think(self, snake):
+        """Cheap bot: take food next to the head, avoid bodies, wander."""
+        grid = self.grid
+        head = snake.body[0]
+        forward = snake.direction
+        left, right = TURNS[forward]
+        options = (forward, left, right)
+        if self.random.random() < 0.05:
+            options = (left, right, forward) if self.random.random() < 0.5 else (right, left, forward)
+        fallback = None
+        for direction in options:
+            owner = grid[self.step_cell(head, direction)]
+            if owner == FOOD:
+                snake.direction = direction
+                return
+            if owner == EMPTY and fallback is None:
+                fallback = direction
+        if fallback is not None:
+            snake.direction = fallback
+
+    def tick(self):
+        grid = self.grid
+        step_cell = self.step_cell
+        self.tick_count += 1
+
+        moving = []
+        for snake in self.snakes:
+            if snake.alive:
+                if not snake.player:
+                    self.think(snake)
+                moving.append((snake, step_cell(snake.body[0], snake.direction)))
+            elif snake.respawn_at <= self.tick_count:
+                self.place(snake)
+
+        # tails move first, so a head may follow a tail into its old cell
+        heads = {}
+        for snake, head in moving:
+            if grid[head] == FOOD:
+                grid[head] = EMPTY
+                self.food_count -= 1
+                snake.score += 1
+            else:
+                grid[snake.body.pop()] = EMPTY
+            heads[head] = heads.get(head, 0) + 1
+
+        dead = []
+        for snake, head in moving:
+            if heads[head] > 1 or grid[head] != EMPTY:
+                # head-to-head, or head into a body (its own included)
+                dead.append(snake)
+            else:
+                grid[head] = snake.id
+                snake.body.appendleft(head)
+
+        for snake in dead:
+            self.kill(snake)
+
+        self.spawn_food()
+        return dead
+
+    def kill(self, snake):
+        grid = self.grid
+        for cell in snake.body:
+            if grid[cell] == snake.id:
+                grid[cell] = FOOD
+                self.food_count += 1
+        snake.body.clear()
+        snake.alive = False
+        snake.respawn_at = self.tick_count + self.respawn_ticks
+
+
+def benchmark(snakes=1000, cols=400, rows=400, ticks=300, seed=1):
+    arena = Arena(cols, rows, seed=seed)
+    for _ in range(snakes):
+        arena.add_snake()
+    # let the snakes grow a bit before timing
+    for _ in range(50):
+        arena.tick()
+    deaths = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        deaths += len(arena.tick())
+    elapsed = time.perf_counter() - start
+    alive = sum(snake.alive for snake in arena.snakes)
+    cells = sum(len(snake.body) for snake in arena.snakes)
+    print(f"{snakes} snakes on {cols}x{rows}: {ticks / elapsed:.1f} ticks/s "
+          f"({1000 * elapsed / ticks:.2f} ms/tick), {alive} alive, "
+          f"{cells} body cells, {deaths} deaths, {arena.food_count} food")
+    return ticks / elapsed
+
+
+def play(snakes, cols, rows, square_size=12, speed=15):
+    import pygame
+
+    pygame.init()
+    view_x, view_y = 1380, 840
+    game_window = pygame.display.set_mode((view_x, view_y))
+    pygame.display.set_caption("Snake Arena by IanThePlug")
+    fps_controller = pygame.time.Clock()
+    font = pygame.font.SysFont('consolas', 20)
+
+    arena = Arena(cols, rows)
+    player = arena.add_snake(player=True)
+    for _ in range(snakes):
+        arena.add_snake()
+
+    rng = random.Random(7)
+    palette = [pygame.Color(rng.randrange(60, 256), rng.randrange(60, 256), rng.randrange(60, 256))
+               for _ in range(64)]
+    green = pygame.Color(0, 255, 0)
+    red = pygame.Color(255, 0, 0)
+    keys = {pygame.K_w: "UP", pygame.K_UP: "UP", pygame.K_s: "DOWN", pygame.K_DOWN: "DOWN",
+            pygame.K_a: "LEFT", pygame.K_LEFT: "LEFT", pygame.K_d: "RIGHT", pygame.K_RIGHT: "RIGHT"}
+    view_cols = view_x // square_size
+    view_rows = view_y // square_size
+    center = (0, 0)
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                pygame.quit()
+                return
+            elif event.type == pygame.KEYDOWN and event.key in keys and player.alive:
+                arena.set_direction(player, keys[event.key])
+
+        arena.tick()
+
+        # camera follows the player, wrapping like the board does
+        if player.alive:
+            center = (player.body[0] % cols, player.body[0] // cols)
+        left = center[0] - view_cols // 2
+        top = center[1] - view_rows // 2
+        grid = arena.grid
+        game_window.fill((0, 0, 0))
+        for vy in range(view_rows):
+            row = (top + vy) % rows * cols
+            for vx in range(view_cols):
+                owner = grid[row + (left + vx) % cols]
+                if owner == EMPTY:
+                    continue
+                if owner == FOOD:
+                    color = red
+                elif owner == player.id:
+                    color = green
+                else:
+                    color = palette[owner % len(palette)]
+                game_window.fill(color, (vx * square_size + 1, vy * square_size + 1,
+                                         square_size - 1, square_size - 1))
+
+        status = f"Score: {player.score}" if player.alive else "Dead, respawning..."
+        alive = sum(snake.alive for snake in arena.snakes)
+        game_window.blit(font.render(f"{status}   Snakes alive: {alive}", True, (255, 255, 255)), (15, 15))
+        pygame.display.update()
+        fps_controller.tick(speed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snake arena by IanThePlug")
+    parser.add_argument("--bench", action="store_true", help="run the headless benchmark")
+    parser.add_argument("--snakes", type=int, default=None, help="number of bot snakes")
+    parser.add_argument("--size", type=int, nargs=2, default=None, metavar=("COLS", "ROWS"))
+    parser.add_argument("--ticks", type=int, default=300)
+    args = parser.parse_args()
+    if args.bench:
+        cols, rows = args.size or (400, 400)
+        tps = benchmark(args.snakes or 1000, cols, rows, args.ticks)
+        sys.exit(0 if tps >= 15 else 1)
+    cols, rows = args.size or (200, 200)
+    play(args.snakes if args.snakes is not None else 300, cols, rows)
@@ -0,0 +1,63 @@
+"""Example bot for the snake bot protocol (see bot_protocol.py).
+
+    python snakegame/snakeV4.7.py --bot "python snakegame/bot_example.py"
+    python snakegame/snakeV4.7.py --bot-port 5555   and then   python snakegame/bot_example.py --port 5555
+    (from JuegosV1/)
+
+Heads for the food and avoids its own body, nothing clever.
+"""
+import socket
+import sys
+
+MOVES = {"U": (0, -1), "D": (0, 1), "L": (-1, 0), "R": (1, 0)}
+OPPOSITE = {"U": "D", "D": "U", "L": "R", "R": "L"}
+
+
+def choose(cols, rows, direction, food, body):
+    head = body[0]
+    blocked = set(body[:-1])
+    best = None
+    for letter, (dx, dy) in MOVES.items():
+        if letter == OPPOSITE[direction]:
+            continue
+        cell = ((head[0] + dx) % cols, (head[1] + dy) % rows)
+        if cell in blocked:
+            continue
+        distance = abs(cell[0] - food[0]) + abs(cell[1] - food[1])
+        if best is None or distance < best[0]:
+            best = (distance, letter)
+    return best[1] if best else direction
+
+
+def play(lines, write):
+    cols = rows = 0
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == "HELLO":
+            cols, rows = int(parts[1]), int(parts[2])
+        elif parts[0] == "T":
+            tick, direction = parts[1], parts[2]
+            food = (int(parts[3]), int(parts[4]))
+            coords = list(map(int, parts[6:]))
+            body = list(zip(coords[::2], coords[1::2]))
+            write(f"{tick} {choose(cols, rows, direction, food, body)}\n")
+
+
+if __name__ == "__main__":
+    if "--port" in sys.argv:
+        port = int(sys.argv[sys.argv.index("--port") + 1])
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile("rw", buffering=1)
+
+        def write(text):
+            stream.write(text)
+            stream.flush()
+        play(stream, write)
+    else:
+        def write(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        play(sys.stdin, write)
@@ -0,0 +1,247 @@
+"""Line protocol for driving the snake game from an external bot.
+
+The bot is a separate program in any language, attached through its
+stdin/stdout (a subprocess) or through a localhost TCP socket.  All
+messages are single ASCII lines terminated by '\\n'.
+
+Game -> bot
+    HELLO <cols> <rows> <deadline_ms>       once, when the bot is attached
+    T <tick> <dir> <food_x> <food_y> <n> <x1> <y1> ... <xn> <yn>
+                                            every tick; the body is listed
+                                            head first, dir is U/D/L/R
+    DEAD <tick> <score>                     the snake died and restarted
+
+Bot -> game
+    <tick> <U|D|L|R>                        the move for that tick
+
+A reply that does not arrive within the deadline is dropped and the snake
+keeps its last direction, so a slow bot never stalls the frame rate.
+Replies for older ticks are ignored.
+
+Writes never block either: what the bot has not read yet waits in an
+outgoing buffer.  While more than MAX_BACKLOG bytes are waiting the tick
+is not sent and counts as missed, and a bot that reads nothing for
+STALL_SECONDS is disconnected.
+"""
+import os
+import selectors
+import shlex
+import socket
+import subprocess
+import time
+from collections import deque
+
+LETTERS = {"UP": "U", "DOWN": "D", "LEFT": "L", "RIGHT": "R"}
+DIRECTIONS = {letter: name for name, letter in LETTERS.items()}
+OPPOSITE = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+MAX_BACKLOG = 64 * 1024
+STALL_SECONDS = 5.0
+
+
+class PipeTransport:
+    """Runs the bot as a subprocess and talks over its stdin/stdout."""
+
+    def __init__(self, command):
+        self.process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, bufsize=0)
+        self.reader = self.process.stdout
+        os.set_blocking(self.reader.fileno(), False)
+        os.set_blocking(self.process.stdin.fileno(), False)
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def send(self, data):
+        # bytes written, 0 if the pipe is full
+        try:
+            return os.write(self.process.stdin.fileno(), data)
+        except BlockingIOError:
+            return 0
+
+    def recv(self):
+        # b'' means the bot exited, None means nothing to read yet
+        return self.reader.read(4096)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        # called from the game loop, so the bot gets no time to linger
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=0.05)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class SocketTransport:
+    """Waits for one bot to connect to 127.0.0.1:<port>."""
+
+    def __init__(self, port, accept_timeout=30):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(("127.0.0.1", port))
+        server.listen(1)
+        server.settimeout(accept_timeout)
+        print(f"Waiting for a bot on 127.0.0.1:{port}...")
+        try:
+            self.sock, _ = server.accept()
+        finally:
+            server.close()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setblocking(False)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def send(self, data):
+        try:
+            return self.sock.send(data)
+        except BlockingIOError:
+            return 0
+
+    def recv(self):
+        try:
+            return self.sock.recv(4096)
+        except BlockingIOError:
+            return None
+
+    def close(self):
+        self.sock.close()
+
+
+class BotController:
+    def __init__(self, transport, cols, rows, deadline_ms=25):
+        self.transport = transport
+        self.deadline = deadline_ms / 1000
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(transport, selectors.EVENT_READ)
+        self.pending = b""
+        self.outgoing = bytearray()
+        self.last_write = time.perf_counter()
+        self.connected = True
+        self.latencies = deque(maxlen=1000)
+        self.requests = 0
+        self.misses = 0
+        self.dropped = 0
+        self.send(f"HELLO {cols} {rows} {deadline_ms}\n")
+
+    def send(self, line):
+        if not self.outgoing:
+            self.last_write = time.perf_counter()  # the stall clock starts now
+        self.outgoing += line.encode()
+        self.flush()
+
+    def flush(self):
+        """Write what the bot will take without blocking."""
+        if not self.connected:
+            return
+        now = time.perf_counter()
+        try:
+            while self.outgoing:
+                written = self.transport.send(self.outgoing)
+                if not written:
+                    break
+                del self.outgoing[:written]
+                self.last_write = now
+        except OSError:
+            self.disconnect()
+            return
+        if self.outgoing and now - self.last_write > STALL_SECONDS:
+            print(f"Bot has not read anything for {STALL_SECONDS:.0f} s")
+            self.disconnect()
+
+    def disconnect(self):
+        if self.connected:
+            self.connected = False
+            self.selector.close()
+            self.transport.close()
+            print("Bot disconnected")
+
+    def request(self, tick, direction, body_cells, food_cell):
+        """Send the state for `tick` and return the bot's direction.
+
+        Waits at most the deadline; on a timeout, an invalid reply or a
+        reversal the current direction is kept.
+        """
+        if not self.connected:
+            return direction
+        self.flush()
+        if len(self.outgoing) > MAX_BACKLOG:
+            # the bot is not keeping up with its input: skip this tick
+            self.requests += 1
+            self.dropped += 1
+            self.misses += 1
+            return direction
+        cells = " ".join(f"{x} {y}" for x, y in body_cells)
+        start = time.perf_counter()
+        self.send(f"T {tick} {LETTERS[direction]} {food_cell[0]} {food_cell[1]} "
+                  f"{len(body_cells)} {cells}\n")
+        self.requests += 1
+
+        end = start + self.deadline
+        while self.connected:
+            reply = self.read_reply(tick)
+            if reply is not None:
+                self.latencies.append(time.perf_counter() - start)
+                new_direction = DIRECTIONS.get(reply)
+                if new_direction and new_direction != OPPOSITE[direction]:
+                    return new_direction
+                return direction
+            remaining = end - time.perf_counter()
+            if remaining <= 0 or not self.connected:
+                break
+            self.selector.select(remaining)
+            self.flush()
+        self.misses += 1
+        return direction
+
+    def read_reply(self, tick):
+        while True:
+            try:
+                data = self.transport.recv()
+            except OSError:
+                # e.g. the bot reset the connection
+                self.disconnect()
+                return None
+            if data is None:
+                break
+            if not data:
+                self.disconnect()
+                return None
+            self.pending += data
+        reply = None
+        *lines, self.pending = self.pending.split(b"\n")
+        for line in lines:
+            parts = line.split()
+            if len(parts) == 2 and parts[0].isdigit() and int(parts[0]) == tick:
+                reply = parts[1].decode(errors="replace").upper()
+        return reply
+
+    def notify_death(self, tick, score):
+        self.send(f"DEAD {tick} {score}\n")
+
+    def stats(self):
+        """Round-trip latency summary in milliseconds."""
+        if not self.latencies:
+            return {"requests": self.requests, "misses": self.misses, "dropped": self.dropped}
+        ordered = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "misses": self.misses,
+            "dropped": self.dropped,
+            "mean": 1000 * sum(ordered) / len(ordered),
+            "p50": 1000 * ordered[len(ordered) // 2],
+            "p99": 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+            "max": 1000 * ordered[-1],
+        }
+
+    def report(self):
+        s = self.stats()
+        if "mean" not in s:
+            return f"bot: {s['requests']} ticks, {s['misses']} missed ({s['dropped']} not sent)"
+        return (f"bot: {s['requests']} ticks, {s['misses']} missed ({s['dropped']} not sent), rtt "
+                f"mean {s['mean']:.2f} ms, p50 {s['p50']:.2f} ms, "
+                f"p99 {s['p99']:.2f} ms, max {s['max']:.2f} ms")
@@ -0,0 +1,155 @@
+"""Export snake sessions as animated GIFs or numbered PNG sequences.
+
+Frames are rasterized off-screen at one byte per board cell, so capturing
+a frame from the game loop is only a copy of the body cells.  Rendering,
+scaling and compression all happen on a background thread (PNG files on a
+small thread pool), so the game never waits for an encoder.
+
+Identical consecutive frames are merged into one longer frame.  A GIF
+keeps only the cells of each frame (one byte per cell) while recording;
+the images are built and scaled when it is saved, through Pillow, which
+stores each frame as the bounding box of the pixels that changed since
+the previous one.  PNG sequences are named after the tick they show, so
+gaps in the numbering are merged duplicates.  Each PNG holds the whole
+board, so the files work on their own (an image viewer, ffmpeg -i
+frame_%06d.png).
+"""
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+BACKGROUND = 0
+SNAKE = 1
+FOOD = 2
+
+_DONE = object()
+
+
+class ClipExporter:
+    def __init__(self, path, cols, rows, fps=15, scale=12,
+                 snake_color=(0, 255, 0), food_color=(255, 0, 0)):
+        """`path` ending in .gif writes a GIF, anything else is a folder
+        that receives frame_<tick>.png files."""
+        self.path = path
+        self.gif = path.lower().endswith(".gif")
+        if self.gif and Image is None:
+            raise RuntimeError("GIF export needs Pillow (pip install pillow)")
+        self.cols = cols
+        self.rows = rows
+        self.frame_ms = 1000 / fps
+        self.scale = scale
+        self.palette = [(0, 0, 0), tuple(snake_color)[:3], tuple(food_color)[:3]]
+        self.frames = queue.SimpleQueue()
+        self.frame_count = 0
+        self.written = 0
+        self.finished = threading.Event()
+        self.error = None
+        if not self.gif:
+            os.makedirs(path, exist_ok=True)
+            self.encoders = ThreadPoolExecutor(max_workers=2)
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    # -- called from the game loop -------------------------------------
+    def add_frame(self, tick, body_cells, food_cell):
+        """Queue one frame.  Cells are y * cols + x board indices."""
+        self.frames.put((tick, tuple(body_cells), food_cell))
+        self.frame_count += 1
+
+    def close(self):
+        """Finish in the background; use wait() to block on the result."""
+        self.frames.put(_DONE)
+
+    def wait(self, timeout=None):
+        self.finished.wait(timeout)
+        if self.error:
+            raise self.error
+        return self.written
+
+    # -- background thread ---------------------------------------------
+    def run(self):
+        try:
+            self.encode_frames()
+        except Exception as error:
+            self.error = error
+        finally:
+            self.finished.set()
+
+    def encode_frames(self):
+        size = self.cols * self.rows
+        previous = None
+        gif_cells = []
+        durations = []
+        pending = []
+        while True:
+            item = self.frames.get()
+            if item is _DONE:
+                break
+            tick, body, food = item
+            cells = bytearray(size)
+            for cell in body:
+                cells[cell] = SNAKE
+            cells[food] = FOOD
+            cells = bytes(cells)
+            if cells == previous:
+                if durations:
+                    durations[-1] += self.frame_ms
+                continue
+            previous = cells
+            if self.gif:
+                gif_cells.append(cells)
+                durations.append(self.frame_ms)
+            else:
+                name = os.path.join(self.path, f"frame_{tick:06d}.png")
+                pending.append(self.encoders.submit(self.save_png, cells, name))
+                self.written += 1
+
+        if self.gif:
+            if gif_cells:
+                rest = (self.to_image(cells) for cells in gif_cells[1:])
+                self.to_image(gif_cells[0]).save(
+                    self.path, save_all=True, append_images=rest,
+                    duration=[round(d) for d in durations], loop=0,
+                    optimize=False, disposal=1)
+            self.written = len(gif_cells)
+        else:
+            for future in pending:
+                future.result()
+            self.encoders.shutdown()
+
+    def to_image(self, cells):
+        image = Image.frombytes("P", (self.cols, self.rows), cells)
+        image.putpalette([channel for color in self.palette for channel in color])
+        return image.resize((self.cols * self.scale, self.rows * self.scale), Image.NEAREST)
+
+    def save_png(self, cells, name):
+        surface = pygame.image.frombuffer(cells, (self.cols, self.rows), "P")
+        surface.set_palette(self.palette)
+        surface = pygame.transform.scale(surface, (self.cols * self.scale, self.rows * self.scale))
+        pygame.image.save(surface, name)
+
+
+def export_history(rewind_buffer, path, fps=15, **kwargs):
+    """Export everything in a RewindBuffer without blocking the caller.
+
+    The buffer is copied first, so the game can keep recording into it.
+    Returns the exporter; call wait() on it if you need the result.
+    """
+    history = rewind_buffer.copy()
+    exporter = ClipExporter(path, history.cols, history.rows, fps=fps, **kwargs)
+
+    def feed():
+        for tick, body, food in history.replay():
+            exporter.add_frame(tick, body, food)
+        exporter.close()
+
+    threading.Thread(target=feed, daemon=True).start()
+    return exporter
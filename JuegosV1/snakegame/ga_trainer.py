@@ -0,0 +1,204 @@
+"""Genetic algorithm trainer for small neural-network snake controllers.
+
+Each genome is the flat weight vector of a tiny MLP (features -> hidden ->
+straight/left/right).  Fitness comes from headless games (snake_sim.py)
+played in lockstep, so one NumPy forward pass serves every game in a
+batch.  Populations are evaluated on a process pool; all randomness comes
+from the generation seed, so a run is reproducible for a given seed no
+matter how many workers are used.
+
+    python snakegame/ga_trainer.py --generations 100 --out best_genome.npz
+    python snakegame/snakeV4.7.py --genome best_genome.npz      (both from JuegosV1/)
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from snake_sim import LEFT, RIGHT, STRAIGHT, SnakeGame, turn
+
+HIDDEN = 16
+ACTIONS = 3
+
+
+def features(game, out):
+    """Fill `out` with the 11 board features used by the network."""
+    direction = game.direction
+    out[0] = game.danger(turn(direction, STRAIGHT))
+    out[1] = game.danger(turn(direction, LEFT))
+    out[2] = game.danger(turn(direction, RIGHT))
+    out[3:7] = 0
+    out[3 + direction] = 1
+    dx, dy = game.food_offset()
+    out[7] = dy < 0
+    out[8] = dy > 0
+    out[9] = dx < 0
+    out[10] = dx > 0
+
+
+FEATURES = 11
+LAYERS = [(FEATURES, HIDDEN), (HIDDEN,), (HIDDEN, ACTIONS), (ACTIONS,)]
+GENOME_SIZE = sum(int(np.prod(shape)) for shape in LAYERS)
+
+
+def unpack(genomes):
+    """Split (n, GENOME_SIZE) genomes into per-layer weight stacks."""
+    parts = []
+    offset = 0
+    for shape in LAYERS:
+        size = int(np.prod(shape))
+        parts.append(genomes[:, offset:offset + size].reshape((len(genomes),) + shape))
+        offset += size
+    return parts
+
+
+def forward(obs, w1, b1, w2, b2):
+    """Batched forward pass, one network per row of `obs`."""
+    hidden = np.tanh(np.matmul(obs[:, None, :], w1)[:, 0] + b1)
+    return np.matmul(hidden[:, None, :], w2)[:, 0] + b2
+
+
+def play_games(genomes, seeds, max_steps):
+    """Play one game per (genome, seed) pair in lockstep.
+
+    Returns the scores and step counts of every game, shape (genomes, seeds).
+    """
+    genomes = np.asarray(genomes, np.float32)
+    n_genomes, n_seeds = len(genomes), len(seeds)
+    games = [SnakeGame(seed=int(seed)) for _ in range(n_genomes) for seed in seeds]
+    weights = [np.repeat(part, n_seeds, axis=0) for part in unpack(genomes)]
+    obs = np.zeros((len(games), FEATURES), np.float32)
+    active = np.arange(len(games))
+
+    for _ in range(max_steps):
+        for row, index in enumerate(active):
+            features(games[index], obs[row])
+        logits = forward(obs[:len(active)], *(w[active] for w in weights))
+        actions = logits.argmax(axis=1).tolist()
+        still = []
+        for index, action in zip(active.tolist(), actions):
+            game = games[index]
+            if game.step(turn(game.direction, action)):
+                still.append(index)
+        if not still:
+            break
+        active = np.array(still)
+
+    scores = np.array([game.score for game in games], np.float32).reshape(n_genomes, n_seeds)
+    steps = np.array([game.steps for game in games], np.float32).reshape(n_genomes, n_seeds)
+    return scores, steps
+
+
+def evaluate(genomes, seeds, max_steps):
+    scores, steps = play_games(genomes, seeds, max_steps)
+    # food matters most, surviving a little; averaged over the seeds
+    return (scores * 100 + np.minimum(steps, 200) * 0.1).mean(axis=1)
+
+
+def evaluate_population(pool, population, seeds, max_steps, workers):
+    chunks = np.array_split(population, workers * 4)
+    chunks = [chunk for chunk in chunks if len(chunk)]
+    if pool is None:
+        return np.concatenate([evaluate(chunk, seeds, max_steps) for chunk in chunks])
+    futures = [pool.submit(evaluate, chunk, seeds, max_steps) for chunk in chunks]
+    return np.concatenate([future.result() for future in futures])
+
+
+def next_generation(rng, population, fitness, elite, mutation_rate, mutation_scale):
+    order = np.argsort(fitness)[::-1]
+    size = len(population)
+    children = np.empty_like(population)
+    children[:elite] = population[order[:elite]]
+
+    # tournament selection of 3
+    n = size - elite
+    contenders = rng.integers(0, size, (2, n, 3))
+    winners = contenders[np.arange(2)[:, None], np.arange(n)[None, :],
+                         fitness[contenders].argmax(axis=2)]
+    mothers, fathers = population[winners[0]], population[winners[1]]
+    mask = rng.random(mothers.shape) < 0.5
+    offspring = np.where(mask, mothers, fathers)
+    mutate = rng.random(offspring.shape) < mutation_rate
+    offspring += mutate * rng.normal(0, mutation_scale, offspring.shape).astype(np.float32)
+    children[elite:] = offspring
+    return children
+
+
+def save_checkpoint(path, generation, population, fitness, seed):
+    best = int(np.argmax(fitness))
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, generation=generation, population=population, fitness=fitness,
+             best=population[best], best_fitness=fitness[best], seed=seed)
+    os.replace(tmp, path)
+
+
+def load_genome(path):
+    with np.load(path) as data:
+        return data["best"].astype(np.float32)
+
+
+def make_policy(genome):
+    """Policy for snake_sim.Autopilot from a single genome."""
+    weights = unpack(np.asarray(genome, np.float32)[None, :])
+    obs = np.zeros((1, FEATURES), np.float32)
+
+    def policy(game):
+        features(game, obs[0])
+        return int(forward(obs, *weights).argmax())
+    return policy
+
+
+def train(args):
+    workers = args.workers or os.cpu_count()
+    rng = np.random.default_rng(args.seed)
+    start_generation = 0
+    if args.resume and os.path.exists(args.out):
+        with np.load(args.out) as data:
+            population = data["population"]
+            fitness = data["fitness"]
+            start_generation = int(data["generation"]) + 1
+        rng = np.random.default_rng([args.seed, start_generation])
+        population = next_generation(rng, population, fitness, args.elite,
+                                     args.mutation_rate, args.mutation_scale)
+    else:
+        population = rng.normal(0, 1, (args.population, GENOME_SIZE)).astype(np.float32)
+
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for generation in range(start_generation, start_generation + args.generations):
+            # every genome plays the same seeds within a generation
+            seeds = np.random.default_rng([args.seed, generation, 1]).integers(
+                0, 2 ** 31, args.games)
+            start = time.perf_counter()
+            fitness = evaluate_population(pool, population, seeds, args.max_steps, workers)
+            elapsed = time.perf_counter() - start
+            games = len(population) * args.games
+            print(f"gen {generation:4d}  best {fitness.max():8.1f}  mean {fitness.mean():8.1f}  "
+                  f"{games / elapsed:8.0f} games/s  {games / elapsed / workers:7.0f} games/s/core")
+            if generation % args.checkpoint_every == 0 or generation == start_generation + args.generations - 1:
+                save_checkpoint(args.out, generation, population, fitness, args.seed)
+            rng = np.random.default_rng([args.seed, generation + 1])
+            population = next_generation(rng, population, fitness, args.elite,
+                                         args.mutation_rate, args.mutation_scale)
+    finally:
+        if pool:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evolve neural snake controllers")
+    parser.add_argument("--population", type=int, default=256)
+    parser.add_argument("--generations", type=int, default=50)
+    parser.add_argument("--games", type=int, default=4, help="games per genome per generation")
+    parser.add_argument("--max-steps", type=int, default=2000)
+    parser.add_argument("--elite", type=int, default=8)
+    parser.add_argument("--mutation-rate", type=float, default=0.1)
+    parser.add_argument("--mutation-scale", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0, help="processes (default: all cores)")
+    parser.add_argument("--checkpoint-every", type=int, default=5)
+    parser.add_argument("--out", default="best_genome.npz")
+    parser.add_argument("--resume", action="store_true", help="continue from --out")
+    train(parser.parse_args())
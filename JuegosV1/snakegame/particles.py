@@ -0,0 +1,173 @@
+"""Particle effects for the snake game.
+
+All particle state lives in preallocated NumPy arrays (position, velocity,
+remaining life) and is updated in bulk, so a frame never creates Python
+objects per particle.  New particles take the next slots of a ring, which
+caps the total and recycles the oldest ones first.
+
+Drawing rasterizes in bulk too: the disk of every fade step is taken once
+from its pre-rendered sprite as a list of pixel offsets, and draw()
+blends all the particles of one fade step straight into the target's
+32-bit pixel buffer with a handful of vectorized operations (where two
+disks of the same step overlap the later one wins instead of blending
+twice).  That costs a few NumPy temporaries per fade step, sized by the
+pixels covered, but no Python object per particle.  Other surfaces
+(and ones with per-pixel alpha, where a blit blends differently) fall
+back to blitting the sprites, one tuple per particle.
+"""
+import math
+
+import numpy as np
+import pygame
+
+FADE_STEPS = 8
+
+
+class ParticleSystem:
+    def __init__(self, colors, capacity=4096, radius=5, gravity=300.0, drag=0.9, seed=None):
+        self.capacity = capacity
+        self.radius = radius
+        self.gravity = gravity
+        self.drag = drag
+        self.pos = np.zeros((capacity, 2), np.float32)
+        self.vel = np.zeros((capacity, 2), np.float32)
+        self.life = np.zeros(capacity, np.float32)
+        self.max_life = np.ones(capacity, np.float32)
+        self.kind = np.zeros(capacity, np.int16)
+        self.cursor = 0
+        self.rng = np.random.default_rng(seed)
+
+        # scratch buffers so update() and emit() never allocate
+        self._a = np.empty(capacity, np.float32)
+        self._b = np.empty(capacity, np.float32)
+        self._c = np.empty(capacity, np.float32)
+        self._step = np.empty((capacity, 2), np.float32)
+        self._alive = np.empty(capacity, bool)
+        self._frame = np.empty(capacity, np.int16)
+        self._corner = np.empty((capacity, 2), np.intp)
+
+        self.sprites = [self.make_sprites(color) for color in colors]
+        self.colors = [pygame.Color(color) for color in colors]
+        self._mapped = {}  # pixel format -> colors as that format's uint32
+        # (x offsets, y offsets, alpha out of 256) of the disk of every fade step
+        self.disks = []
+        for sprite in self.sprites[0]:
+            alpha = pygame.surfarray.array_alpha(sprite)
+            xs, ys = np.nonzero(alpha)
+            self.disks.append((xs.astype(np.int32), ys.astype(np.int32),
+                               (int(alpha.max()) * 256 + 127) // 255))
+
+    def make_sprites(self, color):
+        color = pygame.Color(color)
+        sprites = []
+        size = 2 * self.radius
+        for step in range(FADE_STEPS):
+            fade = (step + 1) / FADE_STEPS
+            sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (color.r, color.g, color.b, int(255 * fade)),
+                               (self.radius, self.radius), max(1, round(self.radius * fade)))
+            sprites.append(sprite.convert_alpha() if pygame.display.get_surface() else sprite)
+        return sprites
+
+    def emit(self, x, y, count, speed, life, kind=0):
+        """Spawn `count` particles at (x, y) flying out in all directions.
+
+        x and y may also be arrays of `count` positions.
+        """
+        count = min(count, self.capacity)
+        start = self.cursor
+        first = min(count, self.capacity - start)
+        self._emit_slice(start, first, 0, x, y, speed, life, kind)
+        if first < count:
+            self._emit_slice(0, count - first, first, x, y, speed, life, kind)
+        self.cursor = (start + count) % self.capacity
+
+    def _emit_slice(self, start, n, offset, x, y, speed, life, kind):
+        end = start + n
+        angle, spd, tmp = self._a[:n], self._b[:n], self._c[:n]
+        self.rng.random(out=angle, dtype=np.float32)
+        angle *= 2 * math.pi
+        self.rng.random(out=spd, dtype=np.float32)
+        spd *= 0.5 * speed
+        spd += 0.5 * speed
+        np.cos(angle, out=tmp)
+        np.multiply(tmp, spd, out=self.vel[start:end, 0])
+        np.sin(angle, out=tmp)
+        np.multiply(tmp, spd, out=self.vel[start:end, 1])
+
+        if np.ndim(x):
+            self.pos[start:end, 0] = x[offset:offset + n]
+            self.pos[start:end, 1] = y[offset:offset + n]
+        else:
+            self.pos[start:end, 0] = x
+            self.pos[start:end, 1] = y
+
+        self.rng.random(out=tmp, dtype=np.float32)
+        tmp *= 0.5 * life
+        tmp += 0.5 * life
+        self.life[start:end] = tmp
+        self.max_life[start:end] = tmp
+        self.kind[start:end] = kind
+
+    def update(self, dt):
+        vel = self.vel
+        vel *= self.drag ** (dt * 15)
+        vel[:, 1] += self.gravity * dt
+        np.multiply(vel, dt, out=self._step)
+        self.pos += self._step
+        self.life -= dt
+
+    def draw(self, surface):
+        np.greater(self.life, 0, out=self._alive)
+        alive = np.flatnonzero(self._alive)
+        if not len(alive):
+            return
+        np.divide(self.life, self.max_life, out=self._a)
+        np.multiply(self._a, FADE_STEPS - 0.001, out=self._a)
+        np.copyto(self._frame, self._a, casting='unsafe')
+        np.subtract(self.pos, self.radius, out=self._corner, casting='unsafe')
+        if surface.get_bytesize() != 4 or surface.get_flags() & pygame.SRCALPHA:
+            sprites = self.sprites
+            surface.blits([(sprites[kind][frame], corner) for kind, frame, corner in zip(
+                self.kind[alive].tolist(), self._frame[alive].tolist(),
+                self._corner[alive].tolist())], doreturn=False)
+            return
+
+        layout = (surface.get_bitsize(), surface.get_masks(), surface.get_shifts())
+        colors = self._mapped.get(layout)
+        if colors is None:
+            colors = np.array([surface.map_rgb(color) for color in self.colors], np.uint32)
+            self._mapped[layout] = colors
+        width, height = surface.get_size()
+        row = surface.get_pitch() // 4
+        size = 2 * self.radius
+        frames = self._frame[alive]
+        # one uint32 per pixel, rows `row` apart; locks the surface until deleted
+        pixels = np.frombuffer(surface.get_buffer(), np.uint32)
+        try:
+            for step, (dx, dy, alpha) in enumerate(self.disks):
+                which = alive[frames == step]
+                if not len(which):
+                    continue
+                box = self._corner[which]
+                color = np.repeat(colors[self.kind[which]], len(dx))
+                if (box.min() >= 0 and box[:, 0].max() <= width - size
+                        and box[:, 1].max() <= height - size):
+                    index = ((box[:, 1] * row + box[:, 0])[:, None] + (dy * row + dx)).ravel()
+                else:
+                    # some disks stick out of the surface: clip per pixel
+                    xs = (box[:, 0, None] + dx).ravel()
+                    ys = (box[:, 1, None] + dy).ravel()
+                    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+                    index, color = (ys * row + xs)[inside], color[inside]
+                # (color * alpha + dst * (256 - alpha)) >> 8 on two bytes at
+                # a time, the way the sprite would be blended
+                dst = pixels[index]
+                even = (color & 0x00FF00FF) * alpha + (dst & 0x00FF00FF) * (256 - alpha)
+                odd = (color >> 8 & 0x00FF00FF) * alpha + (dst >> 8 & 0x00FF00FF) * (256 - alpha)
+                pixels[index] = (even >> 8 & 0x00FF00FF) | (odd & 0xFF00FF00)
+        finally:
+            del pixels
+
+    def clear(self):
+        self.life[:] = 0
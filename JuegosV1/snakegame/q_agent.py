@@ -0,0 +1,168 @@
+"""Tabular Q-learning agent for the snake game.
+
+The state is packed into 9 bits: danger straight/left/right, food
+up/down/left/right and the current direction, so the whole Q-table is a
+(512, 3) float32 array.  Many headless games (snake_sim.py) run side by
+side and the table is updated for all of them at once, averaging the
+updates of games that visit the same state.
+
+Tables are saved as a small binary file: a 20 byte header followed by the
+raw float32 table.
+
+    python snakegame/q_agent.py --episodes 1000000 --out snake_q.bin
+    python snakegame/snakeV4.7.py --qtable snake_q.bin      (both from JuegosV1/)
+"""
+import argparse
+import os
+import struct
+import time
+
+import numpy as np
+
+from snake_sim import LEFT, RIGHT, STRAIGHT, SnakeGame, turn
+
+STATES = 1 << 9
+ACTIONS = 3
+MAGIC = b"SNKQ"
+HEADER = struct.Struct("<4sHHIQ")  # magic, version, actions, states, episodes
+VERSION = 1
+
+REWARD_FOOD = 10.0
+REWARD_DEATH = -10.0
+REWARD_STEP = -0.01
+
+
+def encode_state(game):
+    direction = game.direction
+    dx, dy = game.food_offset()
+    return (game.danger(turn(direction, STRAIGHT))
+            | game.danger(turn(direction, LEFT)) << 1
+            | game.danger(turn(direction, RIGHT)) << 2
+            | (dy < 0) << 3
+            | (dy > 0) << 4
+            | (dx < 0) << 5
+            | (dx > 0) << 6
+            | direction << 7)
+
+
+def save_table(path, table, episodes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, ACTIONS, STATES, episodes))
+        f.write(np.ascontiguousarray(table, np.float32).tobytes())
+    os.replace(tmp, path)
+
+
+def load_table(path):
+    """Returns (table, episodes trained)."""
+    with open(path, "rb") as f:
+        magic, version, actions, states, episodes = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a snake Q-table")
+        table = np.frombuffer(f.read(), np.float32).reshape(states, actions).copy()
+    return table, episodes
+
+
+def make_policy(table):
+    def policy(game):
+        return int(table[encode_state(game)].argmax())
+    return policy
+
+
+def evaluate(table, games=100, seed=12345):
+    scores = []
+    for i in range(games):
+        game = SnakeGame(seed=seed + i)
+        while game.step(turn(game.direction, int(table[encode_state(game)].argmax()))):
+            pass
+        scores.append(game.score)
+    return float(np.mean(scores)), max(scores)
+
+
+def train(args):
+    rng = np.random.default_rng(args.seed)
+    if args.resume and os.path.exists(args.out):
+        table, episodes = load_table(args.out)
+    else:
+        table, episodes = np.zeros((STATES, ACTIONS), np.float32), 0
+
+    games = [SnakeGame(seed=args.seed * 1_000_003 + i, max_idle=args.max_idle)
+             for i in range(args.batch)]
+    states = np.array([encode_state(game) for game in games], np.intp)
+    rewards = np.empty(args.batch, np.float32)
+    done = np.empty(args.batch, bool)
+    next_states = np.empty(args.batch, np.intp)
+    target_episodes = episodes + args.episodes
+    next_checkpoint = episodes + args.checkpoint_every
+    steps = 0
+    start = time.perf_counter()
+
+    while episodes < target_episodes:
+        epsilon = max(args.epsilon_min, args.epsilon * (1 - episodes / target_episodes))
+        actions = table[states].argmax(axis=1)
+        explore = rng.random(args.batch) < epsilon
+        actions[explore] = rng.integers(0, ACTIONS, int(explore.sum()))
+
+        restarted = []
+        for i, (game, action) in enumerate(zip(games, actions.tolist())):
+            score = game.score
+            alive = game.step(turn(game.direction, action))
+            if not alive and not game.timed_out:
+                rewards[i] = REWARD_DEATH
+                done[i] = True
+            else:
+                # a timeout only cuts the episode short: the move itself was
+                # harmless, so it keeps its reward and bootstraps from the
+                # state it led to
+                rewards[i] = REWARD_FOOD if game.score > score else REWARD_STEP
+                done[i] = False
+            next_states[i] = encode_state(game)
+            if not alive:
+                episodes += 1
+                game.reset()
+                restarted.append(i)
+        steps += args.batch
+
+        best_next = table[next_states].max(axis=1)
+        best_next[done] = 0
+        error = rewards + args.gamma * best_next - table[states, actions]
+        # games that share a (state, action) pair get their errors averaged
+        # instead of summed, so a large batch does not overshoot
+        pairs = states * ACTIONS + actions
+        totals = np.bincount(pairs, weights=error, minlength=STATES * ACTIONS)
+        counts = np.bincount(pairs, minlength=STATES * ACTIONS)
+        np.maximum(counts, 1, out=counts)
+        table += (args.alpha * totals / counts).reshape(STATES, ACTIONS).astype(np.float32)
+        states, next_states = next_states, states
+        for i in restarted:
+            states[i] = encode_state(games[i])
+
+        if episodes >= next_checkpoint or episodes >= target_episodes:
+            next_checkpoint = episodes + args.checkpoint_every
+            # steps/s of training since the last checkpoint, without the
+            # time spent saving and evaluating
+            elapsed = time.perf_counter() - start
+            save_table(args.out, table, episodes)
+            mean, best = evaluate(table, args.eval_games)
+            print(f"{episodes:10d} episodes  eps {epsilon:.3f}  {steps / elapsed:9.0f} steps/s  "
+                  f"greedy score mean {mean:.1f} best {best}")
+            steps = 0
+            start = time.perf_counter()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a tabular Q-learning snake agent")
+    parser.add_argument("--episodes", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=256, help="games played side by side")
+    parser.add_argument("--alpha", type=float, default=0.1)
+    parser.add_argument("--gamma", type=float, default=0.95)
+    parser.add_argument("--epsilon", type=float, default=0.2)
+    parser.add_argument("--epsilon-min", type=float, default=0.001)
+    parser.add_argument("--max-idle", type=int, default=300,
+                        help="end an episode after this many steps without food")
+    parser.add_argument("--checkpoint-every", type=int, default=10_000)
+    parser.add_argument("--eval-games", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="snake_q.bin")
+    parser.add_argument("--resume", action="store_true", help="continue from --out")
+    train(parser.parse_args())
@@ -0,0 +1,323 @@
+"""Memory-mapped experience replay for long snake training runs.
+
+Transitions live in fixed-dtype .npy files opened with np.memmap, so a
+buffer of tens of millions of transitions costs disk space and page
+cache, not Python objects.  The buffer is a ring: once full, new
+transitions overwrite the oldest ones.
+
+Several processes can append at the same time.  Each append claims a
+range of slots under a short file lock, clearing their stamps and
+priorities, writes its rows outside of the lock and then, under the lock
+again, publishes the slots: stamp = sequence number of the transition,
+priority in the sum tree.  The samplers only keep slots whose stamp is
+the sequence number of the newest transition claimed for them, before
+and after the rows are read, so a slot that is being written, or was
+claimed again while it was read, is redrawn or dropped.  A writer that
+comes round the ring to slots another writer is still filling waits for
+it (up to STALE_SECONDS, in case that process died).
+Prioritized sampling uses a sum tree that is stored in a memmap as well
+and updated level by level with vectorized NumPy.
+
+    python replay_buffer.py --demo /tmp/snake_replay --workers 4
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+STALE_SECONDS = 10.0
+
+
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a+b")
+
+    def __enter__(self):
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def close(self):
+        self.file.close()
+
+
+class ReplayBuffer:
+    """Open with ReplayBuffer.create() or ReplayBuffer(path)."""
+
+    @classmethod
+    def create(cls, path, capacity, obs_shape, obs_dtype=np.float32, action_dtype=np.int8):
+        os.makedirs(path, exist_ok=True)
+        obs_shape = tuple(obs_shape)
+        meta = {"capacity": capacity, "obs_shape": obs_shape,
+                "obs_dtype": np.dtype(obs_dtype).str,
+                "action_dtype": np.dtype(action_dtype).str}
+        columns = {
+            "obs": ((capacity,) + obs_shape, obs_dtype),
+            "next_obs": ((capacity,) + obs_shape, obs_dtype),
+            "actions": ((capacity,), action_dtype),
+            "rewards": ((capacity,), np.float32),
+            "dones": ((capacity,), np.bool_),
+            "stamps": ((capacity,), np.int64),
+            "tree": ((2 * tree_leaves(capacity),), np.float64),
+            "counters": ((2,), np.int64),  # total appended, max priority bits
+        }
+        for name, (shape, dtype) in columns.items():
+            array = np.lib.format.open_memmap(os.path.join(path, name + ".npy"),
+                                              mode="w+", dtype=dtype, shape=shape)
+            array.flush()
+            del array
+        counters = np.load(os.path.join(path, "counters.npy"), mmap_mode="r+")
+        counters[1] = np.float64(1.0).view(np.int64)
+        counters.flush()
+        del counters
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        return cls(path)
+
+    def __init__(self, path, alpha=0.6):
+        self.path = path
+        self.alpha = alpha
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.capacity = meta["capacity"]
+        self.leaves = tree_leaves(self.capacity)
+
+        def column(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode="r+")
+        self.obs = column("obs")
+        self.next_obs = column("next_obs")
+        self.actions = column("actions")
+        self.rewards = column("rewards")
+        self.dones = column("dones")
+        self.stamps = column("stamps")
+        self.tree = column("tree")
+        self.counters = column("counters")
+        self.lock = FileLock(os.path.join(path, "lock"))
+
+    # pool workers receive the path and map the files themselves
+    def __getstate__(self):
+        return {"path": self.path, "alpha": self.alpha}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["alpha"])
+
+    def __len__(self):
+        return int(min(self.counters[0], self.capacity))
+
+    @property
+    def max_priority(self):
+        return float(self.counters[1:2].view(np.float64)[0])
+
+    def append(self, obs, actions, rewards, next_obs, dones, priorities=None):
+        """Append a batch of transitions; safe from several processes."""
+        n = len(actions)
+        if n > self.capacity:
+            raise ValueError("batch larger than the buffer")
+        deadline = time.monotonic() + STALE_SECONDS
+        while True:
+            with self.lock:
+                start = int(self.counters[0])
+                slots = np.arange(start, start + n) % self.capacity
+                # stamp 0 on a slot claimed one lap ago: still being written
+                busy = (self.stamps[slots] == 0) & (np.arange(start, start + n) >= self.capacity)
+                if not busy.any() or time.monotonic() > deadline:
+                    self.counters[0] = start + n
+                    # unpublished until the rows are written
+                    self.stamps[slots] = 0
+                    self._set_priorities(slots, np.zeros(n))
+                    break
+            time.sleep(0.001)
+
+        self.obs[slots] = obs
+        self.next_obs[slots] = next_obs
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.dones[slots] = dones
+
+        with self.lock:
+            if priorities is None:
+                priorities = np.full(n, self.max_priority)
+            self._set_priorities(slots, priorities)
+            self.stamps[slots] = np.arange(start + 1, start + n + 1)
+
+    def _set_priorities(self, slots, priorities):
+        if len(slots) == 0:
+            return
+        priorities = np.asarray(priorities, np.float64)
+        top = priorities.max(initial=0.0)
+        if top > self.max_priority:
+            self.counters[1] = np.float64(top).view(np.int64)
+        tree = self.tree
+        nodes = slots + self.leaves
+        tree[nodes] = priorities ** self.alpha
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
+
+    def update_priorities(self, slots, priorities):
+        slots = np.asarray(slots)
+        priorities = np.asarray(priorities)
+        with self.lock:
+            # a slot being rewritten keeps priority 0 until it is published
+            published = self.stamps[slots] != 0
+            self._set_priorities(slots[published], priorities[published])
+
+    def _valid(self, slots):
+        # the stamp must be the sequence number of the newest transition
+        # claimed for the slot: 0 while it is written, older if it was
+        # claimed again after a wraparound and is not written yet
+        last = int(self.counters[0]) - 1
+        return self.stamps[slots] == last - (last - slots) % self.capacity + 1
+
+    def _redraw(self, slots, draw):
+        for _ in range(10):
+            bad = ~self._valid(slots)
+            if not bad.any():
+                return slots
+            slots[bad] = draw(int(bad.sum()))
+        return slots[self._valid(slots)]
+
+    def _gather(self, slots):
+        slots = np.sort(slots)  # sequential reads from the files
+        stamps = self.stamps[slots]
+        arrays = {
+            "obs": self.obs[slots],
+            "actions": self.actions[slots],
+            "rewards": self.rewards[slots],
+            "next_obs": self.next_obs[slots],
+            "dones": self.dones[slots],
+        }
+        # rows of slots a writer claimed since they were drawn are dropped
+        kept = (self.stamps[slots] == stamps) & (stamps != 0)
+        if not kept.all():
+            slots = slots[kept]
+            arrays = {name: array[kept] for name, array in arrays.items()}
+        return slots, arrays
+
+    def sample(self, batch_size, rng):
+        """Uniform batch; returns (slots, dict of arrays).  Slots that are
+        being written are redrawn and slots claimed while they are read
+        are dropped, so now and then the batch is a little short."""
+        size = len(self)
+        slots = self._redraw(rng.integers(0, size, batch_size),
+                             lambda count: rng.integers(0, size, count))
+        return self._gather(slots)
+
+    def sample_prioritized(self, batch_size, rng, beta=0.4):
+        """Proportional prioritized batch.
+
+        Returns (slots, arrays, importance weights); feed new TD errors
+        back with update_priorities(slots, errors).
+        """
+        total = self.tree[1]
+        # one uniform draw per equal segment of the total priority; slots
+        # that are being written have priority 0, but a writer can claim
+        # one after the walk, so they are checked and redrawn all the same
+        targets = (np.arange(batch_size) + rng.random(batch_size)) * (total / batch_size)
+        slots = self._redraw(self._descend(targets),
+                             lambda count: self._descend(rng.random(count) * total))
+        slots, arrays = self._gather(slots)
+        probabilities = self.tree[slots + self.leaves] / total
+        weights = (len(self) * np.maximum(probabilities, 1e-12)) ** -beta
+        weights /= weights.max(initial=1e-12)
+        return slots, arrays, weights.astype(np.float32)
+
+    def _descend(self, targets):
+        tree = self.tree
+        nodes = np.ones(len(targets), np.int64)
+        while nodes[0] < self.leaves:
+            left = tree[2 * nodes]
+            go_right = targets > left
+            targets = targets - left * go_right
+            nodes = 2 * nodes + go_right
+        return np.minimum(nodes - self.leaves, len(self) - 1)
+
+    def flush(self):
+        for array in (self.obs, self.next_obs, self.actions, self.rewards,
+                      self.dones, self.stamps, self.tree, self.counters):
+            array.flush()
+
+
+def tree_leaves(capacity):
+    leaves = 1
+    while leaves < capacity:
+        leaves *= 2
+    return leaves
+
+
+def collect(buffer, seed, steps, chunk=4096):
+    """Worker for the demo: play random-ish snake games and append them."""
+    from ga_trainer import FEATURES, features
+    from snake_sim import SnakeGame, turn
+
+    rng = np.random.default_rng(seed)
+    game = SnakeGame(seed=seed)
+    obs = np.zeros((chunk, FEATURES), np.float32)
+    next_obs = np.zeros((chunk, FEATURES), np.float32)
+    actions = np.zeros(chunk, np.int8)
+    rewards = np.zeros(chunk, np.float32)
+    dones = np.zeros(chunk, bool)
+    for _ in range(steps // chunk):
+        for i in range(chunk):
+            features(game, obs[i])
+            action = int(rng.integers(3))
+            score = game.score
+            alive = game.step(turn(game.direction, action))
+            actions[i] = action
+            rewards[i] = -1.0 if not alive else float(game.score - score)
+            dones[i] = not alive
+            if not alive:
+                game.reset()
+            features(game, next_obs[i])
+        buffer.append(obs, actions, rewards, next_obs, dones)
+    return steps // chunk * chunk
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ProcessPoolExecutor
+    from ga_trainer import FEATURES
+
+    parser = argparse.ArgumentParser(description="Fill and benchmark a snake replay buffer")
+    parser.add_argument("--demo", metavar="DIR", required=True)
+    parser.add_argument("--capacity", type=int, default=1_000_000)
+    parser.add_argument("--steps", type=int, default=200_000, help="transitions per worker")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    buffer = ReplayBuffer.create(args.demo, args.capacity, (FEATURES,))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool:
+        total = sum(pool.map(collect, [buffer] * args.workers, range(args.workers),
+                             [args.steps] * args.workers))
+    elapsed = time.perf_counter() - start
+    print(f"appended {total} transitions from {args.workers} workers "
+          f"({total / elapsed:.0f}/s), buffer holds {len(buffer)}")
+
+    rng = np.random.default_rng(0)
+    for name, sample in (("uniform", lambda: buffer.sample(args.batch, rng)),
+                         ("prioritized", lambda: buffer.sample_prioritized(args.batch, rng))):
+        start = time.perf_counter()
+        for _ in range(1000):
+            sample()
+        elapsed = time.perf_counter() - start
+        print(f"{name:12s} {1000 / elapsed:8.0f} batches/s of {args.batch}")
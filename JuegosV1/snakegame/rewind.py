@@ -0,0 +1,161 @@
+"""Rewind buffer for the snake game.
+
+Every tick is stored as one packed integer (new head cell, tail popped,
+new food cell, direction, reset) in a fixed-size ring buffer.  Every
+`keyframe_interval` ticks a copy of the body is kept so that seeking only
+replays the deltas after the nearest keyframe.
+"""
+from array import array
+from collections import deque
+
+DIRECTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
+
+# packed delta layout (64 bits):
+#   bits  0-23  head cell
+#   bit     24  tail popped
+#   bit     25  reset (snake died and restarted on this tick)
+#   bits 26-27  direction
+#   bits 28-52  food cell + 1 (0 = food did not move)
+HEAD_MASK = (1 << 24) - 1
+POPPED_BIT = 1 << 24
+RESET_BIT = 1 << 25
+DIR_SHIFT = 26
+FOOD_SHIFT = 28
+
+
+class RewindBuffer:
+    def __init__(self, cols, rows, square_size, capacity, keyframe_interval=30):
+        self.cols = cols
+        self.rows = rows
+        self.square_size = square_size
+        self.capacity = capacity
+        self.keyframe_interval = keyframe_interval
+        self.deltas = array('Q', bytes(8 * capacity))
+        # (tick, body cells, food cell, direction); only keyframes whose
+        # following deltas are still in the ring are kept
+        self.keyframes = deque(maxlen=capacity // keyframe_interval + 1)
+        self.tick = -1
+        self.last_food = -1
+
+    # -- cell <-> pixel position helpers -------------------------------
+    def to_cell(self, pos):
+        return (pos[1] // self.square_size) * self.cols + pos[0] // self.square_size
+
+    def to_pos(self, cell):
+        return [(cell % self.cols) * self.square_size,
+                (cell // self.cols) * self.square_size]
+
+    # -- recording -----------------------------------------------------
+    def clear(self):
+        self.keyframes.clear()
+        self.tick = -1
+        self.last_food = -1
+
+    def oldest_tick(self):
+        """First tick that can still be reconstructed, or -1 if empty."""
+        if not self.keyframes:
+            return -1
+        return self.keyframes[0][0]
+
+    def record(self, snake_body, food_pos, direction, popped, reset=False):
+        """Store the state reached at the end of a tick.
+
+        `snake_body` is only read when a keyframe is due (or on the very
+        first tick), so the per-tick cost does not depend on its length.
+        """
+        self.tick += 1
+        tick = self.tick
+        food = self.to_cell(food_pos)
+        delta = self.to_cell(snake_body[0]) | (DIRECTIONS.index(direction) << DIR_SHIFT)
+        if popped:
+            delta |= POPPED_BIT
+        if reset:
+            delta |= RESET_BIT
+        if food != self.last_food:
+            delta |= (food + 1) << FOOD_SHIFT
+            self.last_food = food
+        self.deltas[tick % self.capacity] = delta
+
+        if tick % self.keyframe_interval == 0 or not self.keyframes:
+            cells = array('I', [self.to_cell(pos) for pos in snake_body])
+            self.keyframes.append((tick, cells, food, direction))
+        # drop keyframes whose deltas have been overwritten by the ring
+        while len(self.keyframes) > 1 and self.keyframes[0][0] <= tick - self.capacity:
+            self.keyframes.popleft()
+
+    def truncate(self, tick):
+        """Forget everything recorded after `tick` (used when resuming)."""
+        while self.keyframes and self.keyframes[-1][0] > tick:
+            self.keyframes.pop()
+        self.tick = tick
+        state = self.seek(tick)
+        self.last_food = self.to_cell(state[1]) if state else -1
+
+    # -- seeking -------------------------------------------------------
+    def seek(self, tick):
+        """Rebuild (snake_body, food_pos, direction) at `tick`.
+
+        Cost is one keyframe copy plus at most `keyframe_interval` deltas.
+        Returns None when the tick is outside the buffered window.
+        """
+        if tick > self.tick or tick < self.oldest_tick():
+            return None
+        keyframe = None
+        for kf in reversed(self.keyframes):
+            if kf[0] <= tick:
+                keyframe = kf
+                break
+        if keyframe is None:
+            return None
+
+        kf_tick, cells, food, direction = keyframe
+        body = deque(cells)
+        for t in range(kf_tick + 1, tick + 1):
+            food, direction = self.apply(body, t, food, direction)
+        return [self.to_pos(cell) for cell in body], self.to_pos(food), direction
+
+    def apply(self, body, tick, food, direction):
+        delta = self.deltas[tick % self.capacity]
+        head = delta & HEAD_MASK
+        if delta & RESET_BIT:
+            body.clear()
+        elif delta & POPPED_BIT:
+            body.pop()
+        body.appendleft(head)
+        if delta >> FOOD_SHIFT:
+            food = (delta >> FOOD_SHIFT) - 1
+        return food, DIRECTIONS[(delta >> DIR_SHIFT) & 3]
+
+    def replay(self, start=None, end=None):
+        """Yield (tick, body cells, food cell) for every tick in the window.
+
+        Only the first tick costs a seek, the rest is one delta each.  The
+        body deque is reused between ticks, copy it if you keep it.
+        """
+        start = self.oldest_tick() if start is None else max(start, self.oldest_tick())
+        end = self.tick if end is None else min(end, self.tick)
+        if start < 0 or start > end:
+            return
+        state = self.seek(start)
+        body = deque(self.to_cell(pos) for pos in state[0])
+        food = self.to_cell(state[1])
+        direction = state[2]
+        yield start, body, food
+        for t in range(start + 1, end + 1):
+            food, direction = self.apply(body, t, food, direction)
+            yield t, body, food
+
+    def copy(self):
+        """Independent copy, e.g. to export the history from another thread."""
+        other = RewindBuffer(self.cols, self.rows, self.square_size,
+                             self.capacity, self.keyframe_interval)
+        other.deltas = array('Q', self.deltas)
+        other.keyframes = deque(self.keyframes, maxlen=self.keyframes.maxlen)
+        other.tick = self.tick
+        other.last_food = self.last_food
+        return other
+
+    def seek_back(self, ticks):
+        """Tick number and state `ticks` ticks ago, clamped to the window."""
+        tick = max(self.tick - ticks, self.oldest_tick())
+        return tick, self.seek(tick)
@@ -0,0 +1,143 @@
+"""Shared-memory board export for the snake game.
+
+The game writes the board into a `multiprocessing.shared_memory` block
+after every tick; other local processes attach by name and read
+consistent snapshots without sockets or pickling.
+
+Block layout (little endian):
+    0   u64  sequence number (odd while the game is writing)
+    8   u16  cols
+    10  u16  rows
+    12  i16  head x, head y   (cells)
+    16  i16  food x, food y   (cells)
+    20  u32  score
+    24  u64  tick
+    32  u8[cols * rows] grid, row major: 0 empty, 1 body, 2 head, 3 food
+
+Readers use the seqlock protocol: read the sequence number, copy the
+data, read the sequence number again and retry if it was odd or changed.
+
+Run `python shm_export.py NAME` to watch a running game from a terminal.
+"""
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+SEQ = struct.Struct('<Q')
+HEADER = struct.Struct('<QHHhhhhIQ')
+GRID_OFFSET = HEADER.size
+
+EMPTY = 0
+BODY = 1
+HEAD = 2
+FOOD = 3
+
+
+class BoardExporter:
+    def __init__(self, name, cols, rows, replace=False):
+        """`replace` removes a block with the same name first, e.g. one left
+        over from a game that was killed.  Without it an existing block is
+        an error, since another game may still be using it."""
+        self.cols = cols
+        self.rows = rows
+        size = GRID_OFFSET + cols * rows
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            if not replace:
+                raise FileExistsError(f"shared memory block {name!r} already exists; "
+                                      "is another game using it?") from None
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.grid = bytearray(cols * rows)
+        self.seq = 0
+        self.tick = 0
+        HEADER.pack_into(self.shm.buf, 0, 0, cols, rows, -1, -1, -1, -1, 0, 0)
+
+    def publish(self, body_cells, food_cell, score):
+        """Write one tick.  Cells are (x, y) pairs in board coordinates."""
+        grid = self.grid
+        cols = self.cols
+        grid[:] = bytes(len(grid))
+        for x, y in body_cells:
+            grid[y * cols + x] = BODY
+        head_x, head_y = body_cells[0]
+        food_x, food_y = food_cell
+        grid[head_y * cols + head_x] = HEAD
+        grid[food_y * cols + food_x] = FOOD
+
+        buf = self.shm.buf
+        self.seq += 1
+        SEQ.pack_into(buf, 0, self.seq)
+        HEADER.pack_into(buf, 0, self.seq, cols, self.rows,
+                         head_x, head_y, food_x, food_y, score, self.tick)
+        buf[GRID_OFFSET:GRID_OFFSET + len(grid)] = grid
+        self.seq += 1
+        SEQ.pack_into(buf, 0, self.seq)
+        self.tick += 1
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class BoardReader:
+    def __init__(self, name):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 always registers the block with the resource
+            # tracker, which would unlink it when this reader exits
+            from multiprocessing import resource_tracker
+            self.shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        _, self.cols, self.rows = HEADER.unpack_from(self.shm.buf, 0)[:3]
+        self.grid_view = self.shm.buf[GRID_OFFSET:GRID_OFFSET + self.cols * self.rows]
+
+    def sequence(self):
+        return SEQ.unpack_from(self.shm.buf, 0)[0]
+
+    def changed_since(self, seq):
+        """True if a zero-copy read started at `seq` may be torn."""
+        return seq & 1 or self.sequence() != seq
+
+    def read(self):
+        """Consistent snapshot: (header dict, grid bytes)."""
+        buf = self.shm.buf
+        while True:
+            seq = self.sequence()
+            if seq & 1:
+                continue
+            header = HEADER.unpack_from(buf, 0)
+            grid = bytes(self.grid_view)
+            if self.sequence() == seq:
+                break
+        _, cols, rows, head_x, head_y, food_x, food_y, score, tick = header
+        return {'seq': seq, 'tick': tick, 'cols': cols, 'rows': rows,
+                'head': (head_x, head_y), 'food': (food_x, food_y),
+                'score': score}, grid
+
+    def close(self):
+        self.grid_view.release()
+        self.shm.close()
+
+
+if __name__ == "__main__":
+    reader = BoardReader(sys.argv[1] if len(sys.argv) > 1 else "snake_board")
+    chars = ".o@*"
+    last_seq = -1
+    try:
+        while True:
+            info, grid = reader.read()
+            if info['seq'] != last_seq:
+                last_seq = info['seq']
+                lines = [''.join(chars[c] for c in grid[y * info['cols']:(y + 1) * info['cols']])
+                         for y in range(info['rows'])]
+                print(f"\x1b[H\x1b[Jtick {info['tick']}  score {info['score']}")
+                print('\n'.join(lines))
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        reader.close()
@@ -3,6 +3,41 @@ import sys
 import random
 import pickle
 import os
+import atexit
+import argparse
+import time
+from rewind import RewindBuffer
+
+try:
+    import numpy
+    from particles import ParticleSystem
+except ImportError:  # numpy is optional, the game just runs without effects
+    ParticleSystem = None
+
+parser = argparse.ArgumentParser(description="Snake Game by IanThePlug")
+parser.add_argument("--shm", metavar="NAME",
+                    help="publish the board every tick to the shared memory block NAME")
+parser.add_argument("--shm-replace", action="store_true",
+                    help="remove an existing block named NAME first (left over from a killed game)")
+parser.add_argument("--clip-format", choices=["gif", "png"], default="gif",
+                    help="format of the clips saved with F9/F10 (default: gif, png without Pillow)")
+parser.add_argument("--bot", metavar="COMMAND",
+                    help="let a bot program play, talking over its stdin/stdout")
+parser.add_argument("--bot-port", metavar="PORT", type=int,
+                    help="let a bot play, waiting for it to connect to this localhost port")
+parser.add_argument("--bot-deadline", metavar="MS", type=int, default=25,
+                    help="how long to wait for the bot each tick (default: 25)")
+parser.add_argument("--genome", metavar="FILE",
+                    help="let a network trained with ga_trainer.py play")
+parser.add_argument("--qtable", metavar="FILE",
+                    help="let a Q-table trained with q_agent.py play")
+args = parser.parse_args()
+
+if args.clip_format == "gif":
+    from clip_export import Image
+    if Image is None:  # GIFs are written through Pillow, which is optional
+        print("Pillow is not installed, F9/F10 clips will be saved as PNG frames")
+        args.clip_format = "png"
 
 speed = 15
 
@@ -35,6 +70,10 @@ gray = pygame.Color(128, 128, 128)
 # initial snake color
 snake_color = green
 
+# particle effects, one sprite set per color
+particle_colors = [red, yellow, gray, green, blue, violet, celeste]
+particles = ParticleSystem(particle_colors) if ParticleSystem else None
+
 fps_controller = pygame.time.Clock()
 # one snake square size
 square_size = 60
@@ -46,6 +85,77 @@ volume_file = "volume.pkl"
 controls_file = "controls.pkl"  # Archivo para almacenar el esquema de controles
 volume = 0.5
 
+# rewind: how many seconds the BACKSPACE key jumps back, and how many
+# seconds of history are kept in the ring buffer
+rewind_seconds = 3
+rewind_history_seconds = 60
+rewind_buffer = RewindBuffer(frame_size_x // square_size, frame_size_y // square_size,
+                             square_size, speed * rewind_history_seconds,
+                             keyframe_interval=speed * 2)
+
+# clips: F9 starts/stops recording, F10 saves the rewind history
+clips_folder = "clips"
+clip_recorder = None
+pending_clips = []
+
+
+def clip_path():
+    os.makedirs(clips_folder, exist_ok=True)
+    name = time.strftime("snake_%Y%m%d_%H%M%S")
+    extension = ".gif" if args.clip_format == "gif" else ""
+    path = os.path.join(clips_folder, name + extension)
+    count = 1
+    while os.path.exists(path) or any(clip.path == path for clip in pending_clips):
+        count += 1
+        path = os.path.join(clips_folder, f"{name}_{count}{extension}")
+    return path
+
+
+def finish_clips():
+    # clips are encoded in the background, give them a moment on exit
+    if clip_recorder:
+        clip_recorder.close()
+    for clip in pending_clips:
+        clip.finished.wait(10)
+
+
+atexit.register(finish_clips)
+
+
+# optional shared memory export for external viewers and bots
+board_exporter = None
+if args.shm:
+    from shm_export import BoardExporter
+    try:
+        board_exporter = BoardExporter(args.shm, frame_size_x // square_size,
+                                       frame_size_y // square_size, replace=args.shm_replace)
+    except FileExistsError as error:
+        sys.exit(f"{error} (use --shm-replace to take it over)")
+    atexit.register(board_exporter.close)
+
+# optional external bot, replaces the keyboard while attached
+bot = None
+if args.bot or args.bot_port:
+    from bot_protocol import BotController, PipeTransport, SocketTransport
+    transport = PipeTransport(args.bot) if args.bot else SocketTransport(args.bot_port)
+    bot = BotController(transport, frame_size_x // square_size,
+                        frame_size_y // square_size, args.bot_deadline)
+    atexit.register(lambda: print(bot.report()))
+    atexit.register(bot.disconnect)
+
+# optional trained controller playing inside the game
+autopilot = None
+if args.genome:
+    from snake_sim import Autopilot
+    from ga_trainer import load_genome, make_policy
+    autopilot = Autopilot(make_policy(load_genome(args.genome)),
+                          frame_size_x // square_size, frame_size_y // square_size)
+elif args.qtable:
+    from snake_sim import Autopilot
+    from q_agent import load_table, make_policy
+    autopilot = Autopilot(make_policy(load_table(args.qtable)[0]),
+                          frame_size_x // square_size, frame_size_y // square_size)
+
 # Variable para almacenar el esquema de controles
 controls = {"up": pygame.K_w, "down": pygame.K_s,
             "left": pygame.K_a, "right": pygame.K_d}
@@ -436,9 +546,117 @@ def change_color_menu():
                     return
 
 
+def draw_board(body, food):
+    game_window.fill(black)
+    for pos in body:
+        pygame.draw.rect(game_window, snake_color, pygame.Rect(
+            pos[0] + 2, pos[1] + 2,
+            square_size - 2, square_size - 2))
+
+    pygame.draw.rect(game_window, red, pygame.Rect(food[0],
+                                                   food[1], square_size, square_size))
+
+
+def restore_state(tick, state):
+    global direction, head_pos, snake_body, food_pos, food_spawn, score
+    snake_body, food_pos, direction = state
+    head_pos = list(snake_body[0])
+    food_spawn = True
+    score = len(snake_body) - 1
+    rewind_buffer.truncate(tick)
+
+
+def rewind_scrubber():
+    # LEFT/RIGHT move one tick (hold SHIFT for one second), ENTER resumes
+    # from the selected tick, ESC goes back to the game unchanged
+    tick = rewind_buffer.tick
+    if tick < 0:
+        return
+    info_font = pygame.font.SysFont('consolas', 20)
+
+    while True:
+        state = rewind_buffer.seek(tick)
+        draw_board(state[0], state[1])
+        info_surface = info_font.render(
+            f'Rewind: {(tick - rewind_buffer.tick) / speed:.1f}s  '
+            f'(LEFT/RIGHT, ENTER to resume, ESC to cancel)', True, white)
+        game_window.blit(info_surface, (15, 15))
+        pygame.display.flip()
+
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            save_high_score()
+            save_volume()
+            save_controls()
+            pygame.quit()
+            sys.exit()
+        elif event.type == pygame.KEYDOWN:
+            step = speed if event.mod & pygame.KMOD_SHIFT else 1
+            if event.key == pygame.K_LEFT:
+                tick = max(tick - step, rewind_buffer.oldest_tick())
+            elif event.key == pygame.K_RIGHT:
+                tick = min(tick + step, rewind_buffer.tick)
+            elif event.key == pygame.K_RETURN:
+                restore_state(tick, state)
+                return
+            elif event.key == pygame.K_ESCAPE:
+                return
+
+
+def board_cells(body):
+    return [(pos[0] // square_size, pos[1] // square_size) for pos in body]
+
+
+def toggle_clip_recording():
+    global clip_recorder
+    from clip_export import ClipExporter
+    if clip_recorder:
+        clip_recorder.close()
+        clip_recorder = None
+    else:
+        clip_recorder = ClipExporter(clip_path(), rewind_buffer.cols, rewind_buffer.rows,
+                                     fps=speed, snake_color=snake_color)
+        pending_clips.append(clip_recorder)
+
+
+def save_history_clip():
+    from clip_export import export_history
+    if rewind_buffer.tick >= 0:
+        pending_clips.append(export_history(rewind_buffer, clip_path(), fps=speed,
+                                            snake_color=snake_color))
+
+
+def cell_center(pos):
+    return pos[0] + square_size / 2, pos[1] + square_size / 2
+
+
+def effect_eat(pos):
+    x, y = cell_center(pos)
+    particles.emit(x, y, 30, 250, 0.8, particle_colors.index(red))
+    particles.emit(x, y, 20, 150, 0.6, particle_colors.index(yellow))
+
+
+def effect_trail(pos):
+    x, y = cell_center(pos)
+    particles.emit(x, y, 3, 30, 0.5, particle_colors.index(gray))
+
+
+def effect_death(body):
+    # at most 600 particles however long the snake was
+    per_segment = max(1, min(12, 600 // len(body)))
+    centers = numpy.array(body[:600], numpy.float32) + square_size / 2
+    centers = numpy.repeat(centers, per_segment, axis=0)
+    kind = particle_colors.index(snake_color) if snake_color in particle_colors else 0
+    particles.emit(centers[:, 0], centers[:, 1], len(centers), 300, 1.2, kind)
+
+
 def game_loop():
     global direction, head_pos, snake_body, food_pos, food_spawn, score, last_food_pos, high_score
+    bot_font = pygame.font.SysFont('consolas', 20)
+    bot_text = ""
     while True:
+        bot_playing = bot is not None and bot.connected
+        autoplaying = bot_playing or autopilot is not None
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 save_high_score()
@@ -447,7 +665,9 @@ def game_loop():
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.KEYDOWN:
-                if event.key == controls["up"] and direction != "DOWN":
+                if autoplaying and event.key in controls.values():
+                    pass
+                elif event.key == controls["up"] and direction != "DOWN":
                     direction = "UP"
                 elif event.key == controls["down"] and direction != "UP":
                     direction = "DOWN"
@@ -455,10 +675,29 @@ def game_loop():
                     direction = "LEFT"
                 elif event.key == controls["right"] and direction != "LEFT":
                     direction = "RIGHT"
+                elif event.key == pygame.K_BACKSPACE:
+                    tick, state = rewind_buffer.seek_back(
+                        rewind_seconds * speed)
+                    if state:
+                        restore_state(tick, state)
+                elif event.key == pygame.K_F2:
+                    rewind_scrubber()
+                elif event.key == pygame.K_F9:
+                    toggle_clip_recording()
+                elif event.key == pygame.K_F10:
+                    save_history_clip()
                 elif event.key == pygame.K_ESCAPE:
                     main_menu()
                     return
 
+        if bot_playing:
+            direction = bot.request(rewind_buffer.tick + 1, direction,
+                                    board_cells(snake_body),
+                                    board_cells([food_pos])[0])
+        elif autopilot:
+            direction = autopilot.choose(direction, board_cells(snake_body),
+                                         board_cells([food_pos])[0])
+
         if direction == "UP":
             head_pos[1] -= square_size
         elif direction == "DOWN":
@@ -479,37 +718,61 @@ def game_loop():
 
         # eating apple
         snake_body.insert(0, list(head_pos))
+        popped = False
         if head_pos[0] == food_pos[0] and head_pos[1] == food_pos[1]:
             score += 1
             food_spawn = False
             last_food_pos = food_pos
+            if particles:
+                effect_eat(food_pos)
             if score > high_score:
                 high_score = score
                 save_high_score()
         else:
             snake_body.pop()
+            popped = True
 
         # spawn food
         if not food_spawn:
             spawn_food()
 
         # GFX
-        game_window.fill(black)
-        for pos in snake_body:
-            pygame.draw.rect(game_window, snake_color, pygame.Rect(
-                pos[0] + 2, pos[1] + 2,
-                square_size - 2, square_size - 2))
-
-        pygame.draw.rect(game_window, red, pygame.Rect(food_pos[0],
-                                                       food_pos[1], square_size, square_size))
+        draw_board(snake_body, food_pos)
+        if particles:
+            effect_trail(snake_body[-1])
+            particles.update(1 / speed)
+            particles.draw(game_window)
 
         # game over conditions
+        dead = False
         for block in snake_body[1:]:
             if head_pos[0] == block[0] and head_pos[1] == block[1]:
-                init_vars()
+                dead = True
+        if dead:
+            if particles:
+                effect_death(snake_body)
+            if bot_playing:
+                bot.notify_death(rewind_buffer.tick + 1, len(snake_body) - 1)
+            init_vars()
+
+        rewind_buffer.record(snake_body, food_pos, direction, popped, dead)
+        if clip_recorder:
+            clip_recorder.add_frame(rewind_buffer.tick,
+                                    [rewind_buffer.to_cell(pos) for pos in snake_body],
+                                    rewind_buffer.to_cell(food_pos))
+        if board_exporter:
+            board_exporter.publish(board_cells(snake_body),
+                                   board_cells([food_pos])[0], score)
 
         show_score(1, white, 'consolas', 20)
         show_high_score(white, 'consolas', 20)
+        if bot_playing and rewind_buffer.tick % speed == 0:
+            bot_text = bot.report()
+        if clip_recorder:
+            pygame.draw.circle(game_window, red, (frame_size_x - 30, 30), 10)
+        if bot_playing:
+            game_window.blit(bot_font.render(bot_text, True, gray),
+                             (15, frame_size_y - 30))
         pygame.display.update()
         fps_controller.tick(speed)
 
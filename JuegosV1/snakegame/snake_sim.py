@@ -0,0 +1,140 @@
+"""Headless snake rules, for training and evaluating bots.
+
+Same rules as snakeV4.7 in board cells instead of pixels: the board wraps
+at the edges, food appears at a random cell away from the top row and left
+column (never twice in a row at the same place), eating grows the snake by
+one and running into the body ends the game.  No pygame needed.
+"""
+import random
+from collections import deque
+
+COLS = 1380 // 60
+ROWS = 840 // 60
+
+# same order as snakeV4.7 / rewind.py
+DIRECTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
+MOVES = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+OPPOSITE = [1, 0, 3, 2]
+# (left turn, right turn) for each direction
+TURNS = [(2, 3), (3, 2), (1, 0), (0, 1)]
+
+# relative actions used by the learning agents
+STRAIGHT = 0
+LEFT = 1
+RIGHT = 2
+
+
+def turn(direction, action):
+    if action == STRAIGHT:
+        return direction
+    return TURNS[direction][action - 1]
+
+
+class SnakeGame:
+    def __init__(self, cols=COLS, rows=ROWS, seed=None, max_idle=None):
+        self.cols = cols
+        self.rows = rows
+        self.random = random.Random(seed)
+        # a game that goes this long without eating is stopped
+        self.max_idle = max_idle if max_idle is not None else 2 * cols * rows
+        self.reset()
+
+    def reset(self):
+        self.grid = bytearray(self.cols * self.rows)
+        head = self.cols * 1 + 2  # [120, 60] in snakeV4.7
+        self.body = deque([head])
+        self.grid[head] = 1
+        self.direction = 3
+        self.food = -1
+        self.score = 0
+        self.steps = 0
+        self.idle = 0
+        self.dead = False
+        self.timed_out = False  # stopped by max_idle, not by a crash
+        self.spawn_food()
+
+    def spawn_food(self):
+        while True:
+            food = self.random.randrange(1, self.rows) * self.cols + self.random.randrange(1, self.cols)
+            if food != self.food:
+                self.food = food
+                return
+
+    def next_cell(self, cell, direction):
+        dx, dy = MOVES[direction]
+        return ((cell // self.cols + dy) % self.rows * self.cols
+                + (cell % self.cols + dx) % self.cols)
+
+    def step(self, direction):
+        """Move one tick; reversing is ignored like in the game.
+
+        Returns True while the game goes on.
+        """
+        if direction != OPPOSITE[self.direction]:
+            self.direction = direction
+        head = self.next_cell(self.body[0], self.direction)
+        self.steps += 1
+        self.idle += 1
+        if head == self.food:
+            self.score += 1
+            self.idle = 0
+            self.spawn_food()
+        else:
+            self.grid[self.body.pop()] = 0
+        if self.grid[head]:
+            self.dead = True
+            return False
+        self.grid[head] = 1
+        self.body.appendleft(head)
+        if self.idle >= self.max_idle:
+            self.dead = True
+            self.timed_out = True
+            return False
+        return True
+
+    # -- observations shared by the agents ------------------------------
+    def danger(self, direction):
+        """1 if moving that way now would hit the body."""
+        cell = self.next_cell(self.body[0], direction)
+        # the tail moves away this tick unless the head eats
+        return 1 if self.grid[cell] and (cell != self.body[-1] or cell == self.food) else 0
+
+    def food_offset(self):
+        """Shortest (dx, dy) from the head to the food on the wrapped board."""
+        head = self.body[0]
+        dx = self.food % self.cols - head % self.cols
+        dy = self.food // self.cols - head // self.cols
+        if dx > self.cols // 2:
+            dx -= self.cols
+        elif dx < -(self.cols // 2):
+            dx += self.cols
+        if dy > self.rows // 2:
+            dy -= self.rows
+        elif dy < -(self.rows // 2):
+            dy += self.rows
+        return dx, dy
+
+    def set_state(self, body_cells, food_cell, direction):
+        """Load a position from the real game; cells are (x, y) pairs."""
+        self.grid = bytearray(self.cols * self.rows)
+        self.body = deque(y * self.cols + x for x, y in body_cells)
+        for cell in self.body:
+            self.grid[cell] = 1
+        self.food = food_cell[1] * self.cols + food_cell[0]
+        self.direction = DIRECTIONS.index(direction)
+        self.dead = False
+
+
+class Autopilot:
+    """Drives snakeV4.7's game_loop() with a policy over SnakeGame states.
+
+    `policy(game)` returns one of the relative actions.
+    """
+
+    def __init__(self, policy, cols=COLS, rows=ROWS):
+        self.policy = policy
+        self.game = SnakeGame(cols, rows)
+
+    def choose(self, direction, body_cells, food_cell):
+        self.game.set_state(body_cells, food_cell, direction)
+        return DIRECTIONS[turn(self.game.direction, self.policy(self.game))]
@@ -0,0 +1,136 @@
+"""Spectator wall: watch many headless snake games in one window.
+
+Every board is a snake_sim game driven by a bot.  Each frame the board's
+grid bytes are turned into palette indices with NumPy, written into the
+board's own 8-bit tile surface through pygame.surfarray and composited
+onto the window with a single blit per board.
+
+    python spectator.py --boards 64
+    python spectator.py --boards 16 --qtable snake_q.bin
+"""
+import argparse
+import math
+
+import numpy as np
+import pygame
+
+from snake_sim import COLS, LEFT, MOVES, RIGHT, ROWS, STRAIGHT, SnakeGame, turn
+
+EMPTY = 0
+BODY = 1
+FOOD = 2
+HEAD = 3
+GRID = 4
+PALETTE = [(0, 0, 0), (0, 255, 0), (255, 0, 0), (255, 255, 0)] + [(40, 40, 40)] * 252
+
+
+def greedy_policy(game):
+    """Closest move to the food that does not hit the body."""
+    dx, dy = game.food_offset()
+    best = STRAIGHT
+    best_distance = None
+    for action in (STRAIGHT, LEFT, RIGHT):
+        direction = turn(game.direction, action)
+        if game.danger(direction):
+            continue
+        mx, my = MOVES[direction]
+        distance = abs(dx - mx) + abs(dy - my)
+        if best_distance is None or distance < best_distance:
+            best, best_distance = action, distance
+    return best
+
+
+class Board:
+    def __init__(self, policy, seed, scale):
+        self.policy = policy
+        self.seed = seed
+        self.game = SnakeGame(seed=seed)
+        self.games_played = 0
+        self.best = 0
+        self.scale = scale
+        self.tile = pygame.Surface((COLS * scale, ROWS * scale), depth=8)
+        self.tile.set_palette(PALETTE)
+        self.pixels = np.zeros((COLS * scale, ROWS * scale), np.uint8)
+
+    def tick(self):
+        game = self.game
+        if not game.step(turn(game.direction, self.policy(game))):
+            self.best = max(self.best, game.score)
+            self.games_played += 1
+            self.seed += 1_000_003
+            self.game = SnakeGame(seed=self.seed)
+
+    def rasterize(self):
+        game = self.game
+        cells = np.frombuffer(game.grid, np.uint8).reshape(ROWS, COLS).T.copy()
+        cells[game.food % COLS, game.food // COLS] = FOOD
+        head = game.body[0]
+        cells[head % COLS, head // COLS] = HEAD
+        # grid lines: the last pixel row/column of every cell stays dark
+        scaled = self.pixels.reshape(COLS, self.scale, ROWS, self.scale)
+        scaled[:] = cells[:, None, :, None]
+        scaled[:, -1, :, :] = GRID
+        scaled[:, :, :, -1] = GRID
+        pygame.surfarray.blit_array(self.tile, self.pixels)
+        return self.tile
+
+
+def layout(boards, width, height):
+    """Tiles per row and tile scale that fit `boards` boards in the window."""
+    best = None
+    for per_row in range(1, boards + 1):
+        rows = math.ceil(boards / per_row)
+        scale = min(width // (per_row * COLS), (height - 30) // (rows * ROWS))
+        if scale >= 1 and (best is None or scale > best[1]):
+            best = (per_row, scale)
+    return best
+
+
+def run(boards, policy, width=1380, height=840, speed=15):
+    pygame.init()
+    window = pygame.display.set_mode((width, height))
+    pygame.display.set_caption("Snake spectator wall by IanThePlug")
+    clock = pygame.time.Clock()
+    font = pygame.font.SysFont('consolas', 20)
+
+    per_row, scale = layout(boards, width, height)
+    tile_w, tile_h = COLS * scale, ROWS * scale
+    wall = [Board(policy, seed, scale) for seed in range(boards)]
+    positions = [((i % per_row) * tile_w, 30 + (i // per_row) * tile_h) for i in range(boards)]
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                pygame.quit()
+                return
+
+        for board in wall:
+            board.tick()
+
+        window.fill((0, 0, 0), (0, 0, width, 30))
+        window.blits([(board.rasterize(), position) for board, position in zip(wall, positions)],
+                     doreturn=False)
+        best = max(max(board.best, board.game.score) for board in wall)
+        played = sum(board.games_played for board in wall)
+        info = f"{boards} boards  {clock.get_fps():5.1f} fps  games finished: {played}  best score: {best}"
+        window.blit(font.render(info, True, (255, 255, 255)), (10, 5))
+        pygame.display.flip()
+        clock.tick(speed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch many snake bots at once")
+    parser.add_argument("--boards", type=int, default=16)
+    parser.add_argument("--speed", type=int, default=15, help="ticks per second")
+    parser.add_argument("--genome", metavar="FILE", help="network from ga_trainer.py")
+    parser.add_argument("--qtable", metavar="FILE", help="table from q_agent.py")
+    args = parser.parse_args()
+
+    policy = greedy_policy
+    if args.genome:
+        from ga_trainer import load_genome, make_policy
+        policy = make_policy(load_genome(args.genome))
+    elif args.qtable:
+        from q_agent import load_table, make_policy
+        policy = make_policy(load_table(args.qtable)[0])
+    run(args.boards, policy, speed=args.speed)
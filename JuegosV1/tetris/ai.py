@@ -0,0 +1,292 @@
+"""Placement AI for Tetris.
+
+For the current piece every (rotation, column) is tried: the piece is
+dropped straight down from above the stack onto a copy of the bitboard
+rows, full rows are removed and the result is scored with the
+Dellacherie / El-Tetris features, all computed with whole-row bit ops:
+
+    landing height      height of the middle of the piece once placed
+    eroded cells        lines cleared * piece cells that were in them
+    row transitions     filled/empty changes along each row (walls filled)
+    column transitions  filled/empty changes down each column (floor filled)
+    holes               empty cells with a filled cell somewhere above
+    wells               sum of 1 + 2 + ... + depth for every well
+    aggregate height    sum of the column heights
+    bumpiness           sum of the height steps between columns
+
+The default weights are El-Tetris' (the last two features are off).
+
+    python ai.py --games 8 --pieces 2000 --workers 4
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import WALL
+from engine import HARD_DROP, LEFT, RIGHT, ROTATE_CCW, ROTATE_CW, TetrisEngine
+from pieces import BOTTOMS, MASKS, MAX_DX, MAX_DY, MIN_DX, MIN_DY, PIECE_COUNT
+
+FEATURES = ("landing height", "eroded cells", "row transitions", "column transitions",
+            "holes", "wells", "aggregate height", "bumpiness")
+WEIGHTS = (-4.500158825082766, 3.4181268101392694, -3.2178882868487753,
+           -9.348695305445199, -7.899265427351652, -3.3855972247263626, 0.0, 0.0)
+
+
+class PlacementAI:
+    def __init__(self, board, weights=WEIGHTS):
+        # only the geometry of the board is kept; rows are passed in
+        self.width = board.width
+        self.height = board.height
+        self.empty_row = board.empty_row
+        self.full_row = board.full_row
+        self.cells = board.cells_mask
+        self.weights = tuple(weights)
+        self.use_heights = bool(self.weights[6] or self.weights[7])
+        # one wall bit on each side for the row transitions
+        self.edge_mask = (1 << (self.width + 2)) - 1
+        self.edge_pairs = (1 << (self.width + 1)) - 1
+        self.evaluated = 0
+
+    def column_tops(self, rows):
+        """Row index of the highest filled cell of every column (height if empty)."""
+        tops = [self.height] * self.width
+        remaining = self.cells
+        for y, row in enumerate(rows):
+            new = row & remaining
+            if new:
+                remaining &= ~new
+                new >>= WALL
+                while new:
+                    low = new & -new
+                    tops[low.bit_length() - 1] = y
+                    new ^= low
+                if not remaining:
+                    break
+        return tops
+
+    def placements(self, rows, piece):
+        """Every distinct hard-drop result of `piece` on `rows`.
+
+        Yields (rotation, x, y, new rows, lines cleared, eroded cells,
+        landing height).  Placements that would lock above the top row
+        are skipped.
+        """
+        height = self.height
+        width = self.width
+        full = self.full_row
+        empty = self.empty_row
+        tops = self.column_tops(rows)
+        seen = set()
+        for rotation in range(4):
+            masks = MASKS[piece][rotation]
+            bottom = BOTTOMS[piece][rotation]
+            min_dy = MIN_DY[piece][rotation]
+            max_dy = MAX_DY[piece][rotation]
+            for x in range(-MIN_DX[piece][rotation], width - MAX_DX[piece][rotation]):
+                y = min(tops[x + dx] - 1 - dy for dx, dy in bottom)
+                if y + min_dy < 0:
+                    continue
+                shift = x + WALL
+                # rotations of O, I, S and Z can land on the same cells
+                key = (y + min_dy,) + tuple(mask << shift for _, mask in masks)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                new_rows = rows[:]
+                for dy, mask in masks:
+                    new_rows[y + dy] |= mask << shift
+                lines = 0
+                eroded = 0
+                for dy, mask in masks:
+                    if new_rows[y + dy] == full:
+                        lines += 1
+                        eroded += mask.bit_count()
+                if lines:
+                    kept = [row for row in new_rows if row != full]
+                    new_rows = [empty] * lines + kept
+                landing = height - y - (min_dy + max_dy) / 2
+                yield rotation, x, y, new_rows, lines, eroded * lines, landing
+
+    def features(self, rows, eroded=0, landing=0.0):
+        empty = self.empty_row
+        cells = self.cells
+        height = self.height
+        top = 0
+        while top < height and rows[top] == empty:
+            top += 1
+
+        row_transitions = 2 * top
+        column_transitions = 0
+        holes = 0
+        wells = 0
+        covered = 0
+        prev = empty
+        prev_well = 0
+        depth = {}
+        column_heights = {}
+        edge_mask = self.edge_mask
+        edge_pairs = self.edge_pairs
+        for y in range(top, height):
+            row = rows[y]
+            edges = (row >> (WALL - 1)) & edge_mask
+            row_transitions += ((edges ^ (edges >> 1)) & edge_pairs).bit_count()
+            column_transitions += ((row ^ prev) & cells).bit_count()
+            holes += (covered & ~row & cells).bit_count()
+            if self.use_heights:
+                new = row & ~covered & cells
+                while new:
+                    low = new & -new
+                    column_heights[low.bit_length()] = height - y
+                    new ^= low
+            covered |= row
+            # well cells: empty with both neighbours filled (walls count)
+            well = ~row & (row << 1) & (row >> 1) & cells
+            bits = well
+            while bits:
+                low = bits & -bits
+                column = low.bit_length()
+                depth[column] = depth[column] + 1 if prev_well & low else 1
+                wells += depth[column]
+                bits ^= low
+            prev_well = well
+            prev = row
+        column_transitions += (~prev & cells).bit_count()  # the floor is filled
+
+        aggregate = bumpiness = 0
+        if self.use_heights:
+            heights = [column_heights.get(WALL + x + 1, 0) for x in range(self.width)]
+            aggregate = sum(heights)
+            bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+        return (landing, eroded, row_transitions, column_transitions,
+                holes, wells, aggregate, bumpiness)
+
+    def evaluate(self, rows, eroded=0, landing=0.0):
+        self.evaluated += 1
+        return sum(w * f for w, f in zip(self.weights, self.features(rows, eroded, landing)))
+
+    def best(self, rows, piece):
+        """(value, rotation, x, y, new rows, lines) of the best placement, or None."""
+        best = None
+        for rotation, x, y, new_rows, lines, eroded, landing in self.placements(rows, piece):
+            value = self.evaluate(new_rows, eroded, landing)
+            if best is None or value > best[0]:
+                best = (value, rotation, x, y, new_rows, lines)
+        return best
+
+
+class AIPlayer:
+    """Drives a TetrisEngine one action at a time, like a player would.
+
+    With `search` (a search.Search) the placement comes from a lookahead
+    over the preview queue instead of the current piece alone.
+    """
+
+    def __init__(self, engine, weights=WEIGHTS, search=None):
+        self.engine = engine
+        self.ai = PlacementAI(engine.board, weights)
+        self.search = search
+        self.pieces = -1
+        self.rotations = []
+        self.target_x = None
+
+    def next_action(self):
+        engine = self.engine
+        if engine.pieces != self.pieces:
+            # new piece: plan its placement once
+            self.pieces = engine.pieces
+            if self.search:
+                move = self.search.best_move(engine.board.rows, [engine.piece] + engine.next_pieces)
+            else:
+                best = self.ai.best(engine.board.rows, engine.piece)
+                move = best and best[1:3]
+            if move is None:
+                self.rotations, self.target_x = [], engine.x
+            else:
+                # turn first, then slide, then hard drop
+                turns = (move[0] - engine.rotation) % 4
+                self.rotations = [ROTATE_CCW] if turns == 3 else [ROTATE_CW] * turns
+                self.target_x = move[1]
+        if self.rotations:
+            return self.rotations.pop(0)
+        if engine.x < self.target_x:
+            return RIGHT
+        if engine.x > self.target_x:
+            return LEFT
+        return HARD_DROP
+
+    def play_piece(self):
+        """Play the current piece to the end; False if it got stuck."""
+        engine = self.engine
+        pieces = engine.pieces
+        step = engine.step
+        stuck = 0
+        while engine.pieces == pieces and not engine.game_over:
+            action = self.next_action()
+            if not step(action) and action != HARD_DROP:
+                stuck += 1
+                if stuck > 8:
+                    step(HARD_DROP)
+        return not engine.game_over
+
+
+def play_game(seed, max_pieces, weights=WEIGHTS):
+    """One headless game; returns (lines, pieces, score)."""
+    engine = TetrisEngine(seed=seed)
+    player = AIPlayer(engine, weights)
+    while not engine.game_over and engine.pieces < max_pieces:
+        player.play_piece()
+    return engine.lines, engine.pieces, engine.score
+
+
+def play_games(seeds, max_pieces, weights=WEIGHTS, workers=1):
+    """One game per seed, spread over `workers` processes."""
+    seeds = list(seeds)
+    if workers <= 1:
+        return [play_game(seed, max_pieces, weights) for seed in seeds]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(play_game, seeds, [max_pieces] * len(seeds),
+                             [weights] * len(seeds)))
+
+
+def bench_placements(seconds=2.0, seed=0):
+    """Placements generated and scored per second on stacks from real games."""
+    rng = random.Random(seed)
+    engine = TetrisEngine(seed=seed)
+    player = AIPlayer(engine)
+    stacks = []
+    while len(stacks) < 200:
+        if engine.game_over:
+            engine.reset()
+        player.play_piece()
+        stacks.append(list(engine.board.rows))
+    ai = PlacementAI(engine.board)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        rows = stacks[rng.randrange(len(stacks))]
+        piece = rng.randrange(PIECE_COUNT)
+        for rotation, x, y, new_rows, lines, eroded, landing in ai.placements(rows, piece):
+            ai.evaluate(new_rows, eroded, landing)
+            count += 1
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless games with the placement AI")
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--pieces", type=int, default=2000, help="piece limit per game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{bench_placements():.0f} placements/s on one core")
+    start = time.perf_counter()
+    results = play_games(range(args.games), args.pieces, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    for seed, (lines, pieces, score) in enumerate(results):
+        print(f"seed {seed}: {lines} lines, {pieces} pieces, score {score}")
+    total_pieces = sum(pieces for _, pieces, _ in results)
+    print(f"average {sum(lines for lines, _, _ in results) / len(results):.1f} lines, "
+          f"{total_pieces / elapsed:.0f} pieces/s with {args.workers} workers")
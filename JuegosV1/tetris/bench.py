@@ -0,0 +1,624 @@
+"""Micro-benchmarks for the Tetris engine pieces.
+
+    python bench.py              run everything
+    python bench.py bitboard     run one group
+"""
+import random
+import sys
+import time
+
+import ai
+import movegen
+from bitboard import WALL, Bitboard, shape_masks
+from engine import DOWN, HARD_DROP, HOLD, LEFT, RIGHT, ROTATE_CW, TetrisEngine
+from pieces import BOTTOMS, MAX_DY, MIN_DX, PIECE_COUNT, SPAWN_ROTATION, SPAWN_Y, spawn_x, try_rotate
+
+WIDTH = 10
+HEIGHT = 20
+SHAPES = [
+    [[1, 1, 1, 1]],
+    [[1, 1], [1, 1]],
+    [[1, 1, 1], [0, 1, 0]],
+    [[1, 1, 1], [1, 0, 0]],
+    [[1, 1, 1], [0, 0, 1]],
+    [[1, 1, 0], [0, 1, 1]],
+    [[0, 1, 1], [1, 1, 0]]
+]
+
+
+def timeit(label, func, repeat):
+    start = time.perf_counter()
+    func(repeat)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:38s} {repeat / elapsed / 1e6:7.2f} M/s  ({1e9 * elapsed / repeat:6.0f} ns)")
+
+
+def random_stack(rng, height=8, holes=0.2):
+    grid = [[0] * WIDTH for _ in range(HEIGHT)]
+    for y in range(HEIGHT - height, HEIGHT):
+        for x in range(WIDTH):
+            grid[y][x] = 0 if rng.random() < holes else 1
+        grid[y][rng.randrange(WIDTH)] = 0  # never a full row
+    return grid
+
+
+def to_bitboard(grid):
+    board = Bitboard(WIDTH, HEIGHT)
+    for y, row in enumerate(grid):
+        board.place(shape_masks([row]), 0, y, 1)
+    return board
+
+
+# the list-of-lists playfield these replaced, kept for comparison
+def list_valid_move(grid, shape, x, y):
+    for y_offset, row in enumerate(shape):
+        for x_offset, cell in enumerate(row):
+            if cell:
+                if (x + x_offset < 0 or x + x_offset >= WIDTH or
+                    y + y_offset >= HEIGHT or
+                        (y + y_offset >= 0 and grid[y + y_offset][x + x_offset])):
+                    return False
+    return True
+
+
+def bench_bitboard():
+    print("bitboard")
+    rng = random.Random(1)
+    grid = random_stack(rng)
+    board = to_bitboard(grid)
+    probes = [(SHAPES[rng.randrange(7)], rng.randrange(-1, WIDTH), rng.randrange(0, HEIGHT))
+              for _ in range(1000)]
+    mask_probes = [(shape_masks(shape), x, y) for shape, x, y in probes]
+
+    for (shape, x, y), (masks, _, _) in zip(probes, mask_probes):
+        assert list_valid_move(grid, shape, x, y) == (not board.collides(masks, x, y))
+
+    def list_collisions(n):
+        for i in range(n // 1000):
+            for shape, x, y in probes:
+                list_valid_move(grid, shape, x, y)
+
+    def bit_collisions(n):
+        collides = board.collides
+        for i in range(n // 1000):
+            for masks, x, y in mask_probes:
+                collides(masks, x, y)
+
+    def list_full_rows(n):
+        for i in range(n // HEIGHT):
+            for row in grid:
+                all(row)
+
+    def bit_full_rows(n):
+        full = board.full_row
+        for i in range(n // HEIGHT):
+            for row in board.rows:
+                row == full
+
+    def bit_clear(n):
+        for i in range(n):
+            b = Bitboard(WIDTH, HEIGHT)
+            b.rows[-4:] = [b.full_row] * 4
+            b.clear_lines(range(16, 20))
+
+    timeit("valid_move, list grid", list_collisions, 200_000)
+    timeit("collides, bitboard", bit_collisions, 200_000)
+    timeit("full row test, list grid (per row)", list_full_rows, 1_000_000)
+    timeit("full row test, bitboard (per row)", bit_full_rows, 1_000_000)
+    timeit("4-line clear, bitboard (incl. board)", bit_clear, 100_000)
+
+
+def bench_rotation():
+    print("rotation")
+    rng = random.Random(2)
+    grid = random_stack(rng, height=6)
+    board = to_bitboard(grid)
+    probes = [(rng.randrange(PIECE_COUNT), rng.randrange(4), rng.randrange(0, 7), rng.randrange(0, 12))
+              for _ in range(1000)]
+    shape_probes = [(SHAPES[piece], x, y) for piece, _, x, y in probes]
+
+    def list_rotate(n):
+        for i in range(n // 1000):
+            for shape, x, y in shape_probes:
+                rotated = list(zip(*shape[::-1]))
+                list_valid_move(grid, rotated, x, y)
+
+    def table_rotate(n):
+        for i in range(n // 1000):
+            for piece, rotation, x, y in probes:
+                try_rotate(board, piece, rotation, x, y)
+
+    timeit("zip rotate + valid_move, list grid", list_rotate, 200_000)
+    timeit("try_rotate with SRS kicks, bitboard", table_rotate, 200_000)
+
+
+def reference_clear(rows, full, empty):
+    kept = [row for row in rows if row != full]
+    return [empty] * (len(rows) - len(kept)) + kept
+
+
+def bench_clears():
+    print("line clears")
+    rng = random.Random(3)
+    # 1 to 4 full rows, adjacent or split by a partial row like after a tuck
+    layouts = [[19], [18, 19], [17, 19], [17, 18, 19], [16, 17, 19], [16, 18, 19],
+               [16, 17, 18, 19], [10, 11, 12, 13]]
+    boards = []
+    for full_rows in layouts:
+        board = to_bitboard(random_stack(rng, height=12, holes=0.3))
+        for y in full_rows:
+            board.rows[y] = board.full_row
+        expected = reference_clear(board.rows, board.full_row, board.empty_row)
+        copy = Bitboard(WIDTH, HEIGHT)
+        copy.rows = list(board.rows)
+        touched = range(min(full_rows), max(full_rows) + 1)
+        cleared = copy.clear_lines(touched)
+        assert cleared == full_rows, (cleared, full_rows)
+        assert copy.rows == expected
+        assert len(copy.colors) == HEIGHT
+        assert copy.clear_lines(touched) == []
+        boards.append((board, touched))
+    print("  clear_lines checks passed for 1-4 lines (adjacent and split)")
+
+    for lines in (1, 2, 3, 4):
+        board, touched = next((b, t) for b, t in boards
+                              if len([y for y in t if b.rows[y] == b.full_row]) == lines)
+        rows, colors = board.rows, board.colors
+
+        def clear(n, board=board, touched=touched, rows=rows, colors=colors):
+            for i in range(n):
+                board.rows = list(rows)
+                board.colors = list(colors)
+                board.clear_lines(touched)
+        timeit(f"clear_lines, {lines} line(s) (incl. copy)", clear, 100_000)
+
+    empty = to_bitboard(random_stack(rng, height=12, holes=0.3))
+
+    def no_clear(n):
+        for i in range(n):
+            empty.clear_lines(range(16, 20))
+    timeit("clear_lines, nothing to clear", no_clear, 1_000_000)
+
+
+def random_game(engine, rng):
+    # random rotation and column for every piece, then a hard drop
+    step = engine.step
+    while not engine.game_over:
+        for _ in range(rng.randrange(4)):
+            step(ROTATE_CW)
+        action = LEFT if rng.random() < 0.5 else RIGHT
+        for _ in range(rng.randrange(6)):
+            step(action)
+        step(HARD_DROP)
+
+
+def bench_engine():
+    print("engine")
+    rng = random.Random(4)
+    engine = TetrisEngine(WIDTH, HEIGHT, seed=4)
+    games = 2000
+    pieces = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        engine.reset()
+        random_game(engine, rng)
+        pieces += engine.pieces
+    elapsed = time.perf_counter() - start
+    print(f"  {'random games, headless':38s} {games / elapsed:7.0f} games/s "
+          f"({pieces / elapsed / 1e3:.0f}k pieces/s, {pieces / games:.1f} pieces/game)")
+
+    # same rng, same game
+    a = TetrisEngine(seed=9)
+    b = TetrisEngine(seed=9)
+    random_game(a, random.Random(1))
+    random_game(b, random.Random(1))
+    assert a.board.rows == b.board.rows and a.score == b.score
+    print("  seeded games replay identically")
+
+
+def bench_drops():
+    print("drop distance")
+    rng = random.Random(12)
+    checked = tucked = 0
+    # random moves and AI games (stacks with line clears), checked after
+    # every action
+    for seed in range(60):
+        engine = TetrisEngine(WIDTH, HEIGHT, seed=seed)
+        player = ai.AIPlayer(engine) if seed % 2 else None
+        fresh = Bitboard(WIDTH, HEIGHT)
+        while not engine.game_over and engine.pieces < 300:
+            if player:
+                action = player.next_action()
+            else:
+                action = rng.choice((LEFT, RIGHT, ROTATE_CW, DOWN, DOWN, DOWN, HARD_DROP))
+            engine.step(action)
+            if engine.game_over:
+                break
+            distance = engine.drop_distance()
+            assert distance == engine.scan_drop_distance()
+            fresh.rows = engine.board.rows
+            fresh.reset_tops()
+            assert engine.board.tops == fresh.tops, (engine.board.tops, fresh.tops)
+            checked += 1
+    # the move generator's tucks and spins end under overhangs
+    engine = TetrisEngine(WIDTH, HEIGHT, seed=5)
+    for _ in range(30):
+        stack = to_bitboard(random_stack(rng, height=rng.randrange(3, 10), holes=0.3))
+        for piece in range(PIECE_COUNT):
+            for r, x, y, actions in movegen.generate(stack, piece):
+                engine.board = Bitboard(WIDTH, HEIGHT)
+                engine.board.rows = list(stack.rows)
+                engine.board.reset_tops()
+                engine.piece, engine.rotation = piece, SPAWN_ROTATION[piece]
+                engine.x, engine.y = spawn_x(piece, WIDTH), SPAWN_Y[piece]
+                for action in actions[:-1]:
+                    engine.step(action)
+                assert engine.drop_distance() == engine.scan_drop_distance()
+                checked += 1
+                tucked += any(engine.y + dy > engine.board.tops[engine.x + dx]
+                              for dx, dy in BOTTOMS[piece][engine.rotation])
+                engine.step(HARD_DROP)
+                fresh.rows = engine.board.rows
+                fresh.reset_tops()
+                assert engine.board.tops == fresh.tops
+    print(f"  column tops and drop distance match a scan in {checked} states "
+          f"({tucked} under an overhang)")
+
+    engine = TetrisEngine(WIDTH, HEIGHT, seed=3)
+    player = ai.AIPlayer(engine)
+    while engine.pieces < 40:
+        engine.step(player.next_action())
+
+    def fast(n):
+        drop = engine.drop_distance
+        for i in range(n):
+            drop()
+
+    def scan(n):
+        drop = engine.scan_drop_distance
+        for i in range(n):
+            drop()
+    timeit("drop_distance, column tops", fast, 200_000)
+    timeit("drop_distance, row by row", scan, 200_000)
+
+
+def reference_features(grid):
+    # El-Tetris board features straight from the definitions, on a list grid
+    heights = [next((HEIGHT - y for y in range(HEIGHT) if grid[y][x]), 0) for x in range(WIDTH)]
+    filled = lambda x, y: x < 0 or x >= WIDTH or y >= HEIGHT or (y >= 0 and grid[y][x])
+    row_transitions = sum(filled(x, y) != filled(x + 1, y)
+                          for y in range(HEIGHT) for x in range(-1, WIDTH))
+    column_transitions = sum(filled(x, y) != filled(x, y + 1)
+                             for x in range(WIDTH) for y in range(-1, HEIGHT))
+    holes = sum(1 for x in range(WIDTH) for y in range(HEIGHT)
+                if not grid[y][x] and y > HEIGHT - heights[x])
+    wells = 0
+    for x in range(WIDTH):
+        depth = 0
+        for y in range(HEIGHT):
+            if not grid[y][x] and filled(x - 1, y) and filled(x + 1, y):
+                depth += 1
+                wells += depth
+            else:
+                depth = 0
+    bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+    return row_transitions, column_transitions, holes, wells, sum(heights), bumpiness
+
+
+def bench_ai():
+    print("placement ai")
+    rng = random.Random(5)
+    board = Bitboard(WIDTH, HEIGHT)
+    player = ai.PlacementAI(board, ai.WEIGHTS[:6] + (1.0, 1.0))
+    for _ in range(300):
+        grid = random_stack(rng, height=rng.randrange(0, 14), holes=rng.random() * 0.5)
+        expected = reference_features(grid)
+        assert player.features(to_bitboard(grid).rows)[2:] == expected, expected
+    print("  features match the reference on 300 random stacks")
+
+    print(f"  {'placements generated and scored':38s} {ai.bench_placements(1.0):7.0f} /s")
+    seeds = range(5)
+    start = time.perf_counter()
+    results = ai.play_games(seeds, 500)
+    elapsed = time.perf_counter() - start
+    lines = [lines for lines, _, _ in results]
+    pieces = sum(pieces for _, pieces, _ in results)
+    print(f"  seeds 0-4, 500 pieces max: {sum(lines) / len(lines):.1f} lines average "
+          f"{lines}, {pieces / elapsed:.0f} pieces/s")
+
+
+def bench_movegen():
+    print("move generator")
+    rng = random.Random(6)
+    stacks = [to_bitboard(random_stack(rng, height=rng.randrange(2, 10), holes=0.3))
+              for _ in range(100)]
+    placer = ai.PlacementAI(stacks[0])
+    engine = TetrisEngine(WIDTH, HEIGHT)
+    extra = 0
+    for board in stacks:
+        for piece in range(PIECE_COUNT):
+            found = movegen.generate(board, piece)
+            positions = {(r, x, y) for r, x, y, _ in found}
+            # dropping from above never finds anything the search does not
+            for r, x, y, *_ in placer.placements(board.rows, piece):
+                assert (r, x, y) in positions or any(
+                    movegen.after(board, piece, r, x, y).rows ==
+                    movegen.after(board, piece, r2, x2, y2).rows for r2, x2, y2 in positions)
+            extra += len(found) - len(list(placer.placements(board.rows, piece)))
+            # and the engine ends where the search says
+            for r, x, y, actions in found:
+                engine.board = Bitboard(WIDTH, HEIGHT)
+                engine.board.rows = list(board.rows)
+                engine.board.reset_tops()
+                engine.piece, engine.rotation = piece, SPAWN_ROTATION[piece]
+                engine.x, engine.y = spawn_x(piece, WIDTH), SPAWN_Y[piece]
+                for action in actions:
+                    engine.step(action)
+                assert engine.last_lock[:4] == (piece, r, x, y), (engine.last_lock, (r, x, y))
+    print(f"  action replays and drop coverage checked on 100 stacks, "
+          f"{extra} tucks/spins found beyond dropping from above")
+
+    def generate(n):
+        for i in range(n):
+            movegen.generate(stacks[i % len(stacks)], i % PIECE_COUNT)
+    start = time.perf_counter()
+    generate(700)
+    elapsed = (time.perf_counter() - start) / 700
+    print(f"  {'generate, random stacks':38s} {1000 * elapsed:7.2f} ms per call")
+
+
+def bench_vecenv():
+    import numpy as np
+    from vecenv import VecTetris
+    print("vectorized env")
+    # every board of the batch against a TetrisEngine doing the same drops
+    n = 32
+    env = VecTetris(n, WIDTH, HEIGHT, seed=7)
+    rng = np.random.default_rng(7)
+    mirrors = [TetrisEngine(WIDTH, HEIGHT) for _ in range(n)]
+    checked = 0
+    for _ in range(300):
+        actions = rng.integers(0, env.actions, n)
+        pieces = env.pieces.copy()
+        boards, rewards, dones, _ = env.step(actions)
+        for i, engine in enumerate(mirrors):
+            if dones[i]:
+                engine.reset()
+                continue
+            piece, rotation = int(pieces[i]), int(actions[i]) // WIDTH
+            column = min(int(actions[i]) % WIDTH, WIDTH - 1 - int(env.span[piece, rotation]))
+            engine.piece, engine.rotation = piece, rotation
+            engine.x = column - MIN_DX[piece][rotation]
+            engine.y = -1 - MAX_DY[piece][rotation]
+            score = engine.score
+            engine.game_over = False  # its own next piece may not fit, ours does
+            engine.step(HARD_DROP)
+            assert engine.score - score == rewards[i]
+            assert engine.board.rows == [(int(row) << WALL) | engine.board.empty_row for row in boards[i]]
+            checked += 1
+    print(f"  {checked} placements match the engine (board and score)")
+
+    for boards in (64, 1024, 8192):
+        env = VecTetris(boards, WIDTH, HEIGHT, seed=0)
+        actions = rng.integers(0, env.actions, (50, boards))
+        start = time.perf_counter()
+        for step_actions in actions:
+            env.step(step_actions)
+        elapsed = time.perf_counter() - start
+        print(f"  {boards:5d} boards {50 * boards / elapsed / 1e3:8.0f}k placements/s "
+              f"({1000 * elapsed / 50:.2f} ms per step)")
+
+
+def bench_randomizer():
+    from randomizer import MODES, Randomizer
+    print("randomizer")
+    for mode in MODES:
+        a, b = Randomizer(42, mode), Randomizer(42, mode)
+        assert [a.next() for _ in range(1000)] == [b.next() for _ in range(1000)]
+    bag = Randomizer(42)
+    pieces = [bag.next() for _ in range(7000)]
+    assert all(sorted(pieces[i:i + 7]) == list(range(7)) for i in range(0, 7000, 7))
+    classic = Randomizer(42, "classic")
+    pieces = [classic.next() for _ in range(70000)]
+    repeats = sum(a == b for a, b in zip(pieces, pieces[1:])) / len(pieces)
+    print(f"  seeded sequences repeat, bags hold all 7, classic repeat rate {repeats:.3f}")
+
+    # preview and hold do not change the piece order
+    engine = TetrisEngine(seed=3, preview=5)
+    order = [engine.piece] + engine.next_pieces
+    engine.step(HOLD)
+    assert engine.hold_piece == order[0] and engine.piece == order[1]
+    assert engine.step(HOLD) == 0  # once per piece
+    engine.step(HARD_DROP)
+    engine.step(HOLD)
+    assert engine.piece == order[0] and engine.hold_piece == order[2]
+    print("  preview queue and hold slot keep the piece order")
+
+    def draw(n):
+        randomizer = Randomizer(1)
+        for i in range(n):
+            randomizer.next()
+    timeit("7-bag draws", draw, 1_000_000)
+
+
+def run_inputs(timeline, frame_rate, seconds=30.0):
+    # the same key timeline seen by a renderer polling at frame_rate
+    from controls import LOGIC_HZ, Controller
+    engine = TetrisEngine(seed=11)
+    controller = Controller(engine, das=10.5, arr=2.5)
+    now = 0.0
+    frame = 0
+    events = list(timeline)
+    while now < seconds and not engine.game_over:
+        frame += 1
+        frame_end = frame / frame_rate
+        while events and events[0][0] <= frame_end:
+            at, kind, action = events.pop(0)
+            controller.advance((at - now) * LOGIC_HZ)
+            now = at
+            (controller.press if kind == "down" else controller.release)(action)
+        controller.advance((frame_end - now) * LOGIC_HZ)
+        now = frame_end
+    return engine.board.rows, engine.pieces, engine.x, engine.y, engine.rotation
+
+
+def bench_controls():
+    from controls import Controller
+    print("controls")
+    # DAS 10 frames, then one move every 2 frames
+    engine = TetrisEngine(seed=1)
+    controller = Controller(engine, das=10, arr=2, gravity=1000)
+    x = engine.x
+    controller.press(LEFT)
+    moves = []
+    for frame in range(1, 15):
+        controller.advance(1.0)
+        moves.append(x - engine.x)
+    assert moves == [1] * 9 + [2, 2, 3, 3, 4], moves
+    print("  DAS/ARR repeat on the expected frames")
+
+    rng = random.Random(12)
+    timeline = []
+    at = 0.2
+    while at < 30:
+        action = rng.choice([LEFT, RIGHT, DOWN, ROTATE_CW, HARD_DROP])
+        timeline.append((at, "down", action))
+        timeline.append((at + rng.uniform(0.02, 0.5), "up", action))
+        at += rng.uniform(0.3, 0.8)
+    timeline.sort()
+    results = [run_inputs(timeline, rate) for rate in (30, 60, 144, 1000)]
+    assert all(result == results[0] for result in results), [r[1:] for r in results]
+    print(f"  same inputs at 30/60/144/1000 fps give the same game ({results[0][1]} pieces)")
+
+
+def bench_replay():
+    import os
+    import tempfile
+    import replay
+    print("replays")
+    folder = tempfile.mkdtemp()
+    paths = []
+    for seed in range(4):
+        # an AI game with made-up but realistic timestamps
+        engine = TetrisEngine(seed=seed, preview=3)
+        recorder = replay.Recorder(engine)
+        player = ai.AIPlayer(engine)
+        rng = random.Random(seed)
+        ms = 0
+        while not engine.game_over and engine.pieces < 400:
+            action = player.next_action()
+            ms += rng.randrange(30, 200)
+            if engine.step(action):
+                recorder.record(action, ms)
+        paths.append(recorder.save(os.path.join(folder, f"game{seed}.trp")))
+
+    size = sum(os.path.getsize(path) for path in paths)
+    actions = sum(replay.Replay(path).count for path in paths)
+    print(f"  {actions} actions in {size} bytes ({size / actions:.2f} bytes/action with keyframes)")
+
+    start = time.perf_counter()
+    results = [replay.verify(path) for path in paths]
+    elapsed = time.perf_counter() - start
+    assert all(ok for _, ok, *_ in results), results
+    game_time = sum(ms for *_, ms in results) / 1000
+    print(f"  verify: {game_time:.0f} s of play in {elapsed:.2f} s ({game_time / elapsed:.0f}x real time)")
+
+    # seeking from a keyframe lands on the same state as playing from the start
+    saved = replay.Replay(paths[0])
+    for target in (0, 1500, saved.duration // 3, saved.duration // 2, saved.duration):
+        seeked = saved.new_engine()
+        done = saved.seek(seeked, target)
+        played = saved.new_engine()
+        for action in saved.actions[:done]:
+            played.step(action)
+        assert (seeked.board.rows, seeked.score, seeked.piece, seeked.next_pieces) == \
+            (played.board.rows, played.score, played.piece, played.next_pieces)
+    start = time.perf_counter()
+    for i in range(100):
+        saved.seek(saved.new_engine(), rng.randrange(saved.duration))
+    print(f"  seeks match a full re-simulation, {10 * (time.perf_counter() - start):.2f} ms per seek")
+
+    # a damaged file fails
+    with open(paths[1], "r+b") as f:
+        f.seek(40)
+        byte = f.read(1)
+        f.seek(40)
+        f.write(bytes([byte[0] ^ 0x05]))
+    assert not replay.verify(paths[1])[1]
+    print("  a flipped byte is caught")
+
+
+def bench_highscores():
+    import os
+    import pickle
+    import tempfile
+    from highscores import HighScores
+    print("high scores")
+    folder = tempfile.mkdtemp()
+    legacy = os.path.join(folder, "high_score.pkl")
+    with open(legacy, "wb") as f:
+        pickle.dump(1234, f)
+    path = os.path.join(folder, "data", "highscores.json")
+    scores = HighScores(path, size=5, legacy=[legacy])
+    assert scores.best() == 1234
+
+    # 20 games scoring one lock at a time; only an update that moves the
+    # game up the table queues a write, the game never waits for it
+    rng = random.Random(7)
+    finals = []
+    worst = 0.0
+    updates = writes = 0
+    for game in range(20):
+        scores.start_game(seed=game)
+        score = 0
+        for piece in range(1, rng.randrange(50, 300)):
+            score += rng.choice((1, 1, 1, 101, 401))
+            start = time.perf_counter()
+            writes += scores.update(score, 0, piece)
+            worst = max(worst, time.perf_counter() - start)
+            updates += 1
+        finals.append(score)
+        scores.set_replay(f"game{game}.trp")
+    scores.close()
+    expected = sorted(finals + [1234], reverse=True)[:5]
+    assert [e["score"] for e in scores.entries] == expected
+    saved = HighScores(path, size=5).entries
+    assert [e["score"] for e in saved] == expected
+    assert all(e["replay"] == f"game{e['seed']}.trp" for e in saved if e["seed"] is not None)
+    assert writes < updates // 10
+    assert os.listdir(os.path.dirname(path)) == ["highscores.json"]  # no temp files left
+
+    # a record that stays first still reaches the file without close()
+    scores = HighScores(path, size=5, save_interval=0.05)
+    scores.start_game(seed=99)
+    score = expected[0]
+    deadline = time.perf_counter() + 0.3
+    while time.perf_counter() < deadline:
+        score += 1
+        scores.update(score, 0, 0)
+        time.sleep(0.001)
+    time.sleep(0.2)
+    on_disk = HighScores(path, size=5).best()
+    assert score - on_disk < 100, (score, on_disk)  # about 0.05 s of points
+    scores.close()
+    print(f"  {updates} updates, {writes} writes, slowest {1e6 * worst:.0f} us; the saved table matches")
+
+
+GROUPS = {
+    "bitboard": bench_bitboard,
+    "rotation": bench_rotation,
+    "clears": bench_clears,
+    "engine": bench_engine,
+    "drops": bench_drops,
+    "randomizer": bench_randomizer,
+    "ai": bench_ai,
+    "movegen": bench_movegen,
+    "controls": bench_controls,
+    "replay": bench_replay,
+    "highscores": bench_highscores,
+    "vecenv": bench_vecenv,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or GROUPS:
+        GROUPS[name]()
@@ -0,0 +1,141 @@
+"""Bitboard playfield for Tetris.
+
+Every row is one int with bit (WALL + x) set when column x is filled.
+The WALL bits on both sides of the row are always set, so a piece that
+sticks out of the board collides with the wall bits and a collision test
+is one AND per piece row.  A row is full when it equals FULL_ROW.
+
+Colors are kept apart in a small plane of bytearrays (0 = empty, otherwise
+piece color index + 1) that only the drawing code reads.
+
+`tops` holds the row of the highest filled cell of every column (height
+when empty).  place() and clear_lines() keep it up to date as they go;
+code that assigns `rows` directly calls reset_tops() afterwards.
+"""
+WALL = 4
+
+
+def make_masks(width):
+    walls = ((1 << WALL) - 1) | (((1 << WALL) - 1) << (WALL + width))
+    cells = ((1 << width) - 1) << WALL
+    return walls, cells, walls | cells
+
+
+class Bitboard:
+    def __init__(self, width=10, height=20):
+        self.width = width
+        self.height = height
+        self.empty_row, self.cells_mask, self.full_row = make_masks(width)
+        self.rows = [self.empty_row] * height
+        self.colors = [bytearray(width) for _ in range(height)]
+        self.tops = [height] * width
+
+    def reset_tops(self):
+        """Recompute `tops` from the rows, top to bottom."""
+        tops = [self.height] * self.width
+        seen = 0
+        for y, row in enumerate(self.rows):
+            new = row & self.cells_mask & ~seen
+            if new:
+                seen |= new
+                for x in range(self.width):
+                    if new >> (x + WALL) & 1:
+                        tops[x] = y
+                if seen == self.cells_mask:
+                    break
+        self.tops = tops
+
+    def collides(self, masks, x, y):
+        """True if a piece with row masks [(dy, mask), ...] does not fit
+        with its top-left corner at (x, y).  Rows above the board are open."""
+        rows = self.rows
+        shift = x + WALL
+        if shift < 0:
+            return True
+        for dy, mask in masks:
+            row_y = y + dy
+            if row_y >= self.height:
+                return True
+            row = rows[row_y] if row_y >= 0 else self.empty_row
+            if row & (mask << shift):
+                return True
+        return False
+
+    def place(self, masks, x, y, color):
+        """Lock a piece; cells above the top row are dropped."""
+        shift = x + WALL
+        tops = self.tops
+        for dy, mask in masks:
+            row_y = y + dy
+            if row_y < 0:
+                continue
+            self.rows[row_y] |= mask << shift
+            color_row = self.colors[row_y]
+            bits = mask
+            column = x
+            while bits:
+                if bits & 1:
+                    color_row[column] = color
+                    if row_y < tops[column]:
+                        tops[column] = row_y
+                bits >>= 1
+                column += 1
+
+    def filled(self, x, y):
+        return bool(self.rows[y] >> (WALL + x) & 1)
+
+    def clear_lines(self, touched=None):
+        """Remove the full rows among `touched` (all rows if None).
+
+        Only the rows a locked piece touched can have become full, so the
+        caller passes those.  The rows in between are moved down with one
+        slice copy per kept segment.  Returns the cleared row indices, top
+        to bottom, as they were before the clear.
+        """
+        rows = self.rows
+        full = self.full_row
+        if touched is None:
+            touched = range(self.height)
+        cleared = [y for y in touched if 0 <= y < self.height and rows[y] == full]
+        if not cleared:
+            return cleared
+
+        count = len(cleared)
+        colors = self.colors
+        new_rows = [self.empty_row] * count
+        new_colors = [bytearray(self.width) for _ in range(count)]
+        start = 0
+        for y in cleared:
+            new_rows += rows[start:y]
+            new_colors += colors[start:y]
+            start = y + 1
+        new_rows += rows[start:]
+        new_colors += colors[start:]
+        self.rows = new_rows
+        self.colors = new_colors
+
+        # rows above a column's top were empty there and rows only move
+        # down, so its new top is the first filled cell from the old one;
+        # usually that is the old top moved down by the rows cleared below
+        height = self.height
+        tops = self.tops
+        for x in range(self.width):
+            bit = 1 << (x + WALL)
+            y = tops[x]
+            while y < height and not new_rows[y] & bit:
+                y += 1
+            tops[x] = y
+        return cleared
+
+
+def shape_masks(shape):
+    """Row masks of a shape given as a list of rows of 0/1 cells."""
+    masks = []
+    for dy, row in enumerate(shape):
+        mask = 0
+        for dx, cell in enumerate(row):
+            if cell:
+                mask |= 1 << dx
+        if mask:
+            masks.append((dy, mask))
+    return masks
@@ -0,0 +1,168 @@
+"""Input and timing layer for Tetris: held keys, DAS/ARR, gravity, lock delay.
+
+All timings are in frames of a 60 Hz logic clock and may be fractional
+(DAS 10.5 is fine).  The caller measures real time with a monotonic
+high-resolution clock and hands the elapsed frames to advance(), which
+runs the timers in slices of at most one frame, so what happens does not
+depend on how often the screen is redrawn.
+
+    das         frames a direction is held before it auto-repeats
+    arr         frames between auto-repeats, 0 = straight to the wall
+    gravity     frames per row when nothing is pressed
+    soft_drop   frames per row while down is held
+    lock_delay  frames a grounded piece waits before it locks; moving or
+                turning it restarts the wait, up to lock_resets times
+"""
+import math
+
+from engine import DOWN, HARD_DROP, LEFT, LOCKED, NOTHING, RIGHT
+
+LOGIC_HZ = 60
+DAS = 10.0
+ARR = 2.0
+GRAVITY_FRAMES = 30.0
+SOFT_DROP = 2.0
+LOCK_DELAY = 30.0
+LOCK_RESETS = 15
+
+
+class Controller:
+    def __init__(self, engine, step=None, das=DAS, arr=ARR, gravity=GRAVITY_FRAMES,
+                 soft_drop=SOFT_DROP, lock_delay=LOCK_DELAY, lock_resets=LOCK_RESETS):
+        self.engine = engine
+        # step(action) -> engine result; the renderer passes its own to
+        # keep its caches in sync
+        self.step = step or engine.step
+        self.das = das
+        self.arr = arr
+        self.gravity = gravity
+        self.soft_drop = soft_drop
+        self.lock_delay = lock_delay
+        self.lock_resets = lock_resets
+
+        self.held = {LEFT: False, RIGHT: False}
+        self.direction = None   # the most recently pressed held direction
+        self.das_time = 0.0
+        self.repeats = 0
+        self.soft = False
+        self.fall = 0.0         # fraction of the next row
+        self.lock_time = 0.0
+        self.resets = 0
+        self.piece_id = None
+
+    def grounded(self):
+        engine = self.engine
+        return not engine.valid_move(engine.piece, engine.rotation, engine.x, engine.y + 1)
+
+    def new_piece_check(self):
+        engine = self.engine
+        piece_id = (engine.pieces, engine.piece, engine.hold_used)
+        if piece_id != self.piece_id:
+            self.piece_id = piece_id
+            self.fall = 0.0
+            self.lock_time = 0.0
+            self.resets = 0
+
+    def act(self, action):
+        """Apply one action now; moves and turns on the ground restart the
+        lock delay.  Returns True if something changed."""
+        self.new_piece_check()
+        result = self.step(action)
+        if result == NOTHING:
+            return False
+        if result != LOCKED and self.lock_time and self.resets < self.lock_resets:
+            self.lock_time = 0.0
+            self.resets += 1
+        return True
+
+    def press(self, action):
+        if action in self.held:
+            self.held[action] = True
+            self.direction = action
+            self.das_time = 0.0
+            self.repeats = 0
+            return self.act(action)
+        if action == DOWN:
+            self.soft = True
+            # the first row comes right away, like a tap
+            return self.act(DOWN)
+        return self.act(action)
+
+    def release(self, action):
+        if action in self.held:
+            self.held[action] = False
+            if self.direction == action:
+                # fall back to the other direction if it is still held
+                other = RIGHT if action == LEFT else LEFT
+                self.direction = other if self.held[other] else None
+                self.das_time = 0.0
+                self.repeats = 0
+        elif action == DOWN:
+            self.soft = False
+
+    def rows_per_frame(self):
+        if self.soft:
+            return max(1 / self.gravity, 1 / self.soft_drop)
+        return 1 / self.gravity
+
+    def advance(self, frames):
+        """Run the timers for `frames` (fractional) frames; True if the
+        piece moved or locked."""
+        changed = False
+        while frames > 0 and not self.engine.game_over:
+            dt = min(1.0, frames)
+            frames -= dt
+            changed |= self.tick(dt)
+        return changed
+
+    def tick(self, dt):
+        changed = False
+        self.new_piece_check()
+
+        # auto-shift
+        if self.direction is not None:
+            self.das_time += dt
+            if self.das_time >= self.das:
+                if self.arr <= 0:
+                    while self.act(self.direction):
+                        changed = True
+                else:
+                    due = math.floor((self.das_time - self.das) / self.arr) + 1
+                    while self.repeats < due:
+                        self.repeats += 1
+                        changed |= self.act(self.direction)
+
+        # gravity, then the lock delay once the piece rests
+        if not self.grounded():
+            self.fall += dt * self.rows_per_frame()
+            while self.fall >= 1:
+                self.fall -= 1
+                if self.step(DOWN) == NOTHING:
+                    break
+                changed = True
+                self.lock_time = 0.0
+                if self.grounded():
+                    self.fall = 0.0
+                    break
+        else:
+            self.fall = 0.0
+            self.lock_time += dt
+            if self.lock_time >= self.lock_delay:
+                self.step(HARD_DROP)  # locks where it is
+                self.new_piece_check()
+                changed = True
+        return changed
+
+    def next_due(self):
+        """Frames until a timer can change something (for idle waits)."""
+        due = []
+        if self.direction is not None:
+            if self.das_time < self.das:
+                due.append(self.das - self.das_time)
+            elif self.arr > 0:
+                due.append(self.arr * self.repeats - (self.das_time - self.das))
+        if self.grounded():
+            due.append(self.lock_delay - self.lock_time)
+        else:
+            due.append((1 - self.fall) / self.rows_per_frame())
+        return max(0.0, min(due))
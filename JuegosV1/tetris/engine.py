@@ -0,0 +1,163 @@
+"""Headless Tetris rules: no pygame, no window, no clock.
+
+TetrisEngine owns the bitboard, the falling piece and the score and is
+driven only through step(action).  Gravity is an action too, so whoever
+drives the engine decides what time means: the pygame game sends GRAVITY
+from its timer, a bot or a benchmark sends it whenever it likes.
+
+Pieces come from a seeded randomizer.Randomizer, so the same seed and
+the same actions always give the same game.
+
+    engine = TetrisEngine(seed=7)
+    while not engine.game_over:
+        engine.step(HARD_DROP)
+"""
+from bitboard import Bitboard
+from pieces import BOTTOMS, MASKS, MAX_DY, MIN_DY, SPAWN_ROTATION, SPAWN_Y, spawn_x, try_rotate
+from randomizer import Randomizer
+
+# actions
+LEFT, RIGHT, DOWN, ROTATE_CW, ROTATE_CCW, HARD_DROP, GRAVITY, HOLD = range(8)
+ACTIONS = 8
+
+# step() results
+NOTHING, MOVED, LOCKED = range(3)
+
+
+class TetrisEngine:
+    def __init__(self, width=10, height=20, seed=None, mode="bag", preview=1, randomizer=None):
+        self.width = width
+        self.height = height
+        # reset() keeps drawing from the same stream; a new engine with
+        # the same seed replays the same pieces
+        self.randomizer = randomizer if randomizer is not None else Randomizer(seed, mode)
+        self.seed = self.randomizer.seed
+        self.preview = preview
+        self.reset()
+
+    def reset(self):
+        self.board = Bitboard(self.width, self.height)
+        self.score = 0
+        self.lines = 0
+        self.pieces = 0
+        self.game_over = False
+        # (piece, rotation, x, y, cleared rows) of the last lock, for renderers
+        self.last_lock = None
+        # pieces are drawn `preview` pieces ahead, the order stays the same
+        self.next_pieces = [self.randomizer.next() for _ in range(self.preview)]
+        self.hold_piece = None
+        self.hold_used = False
+        self.new_piece()
+
+    def new_piece(self):
+        self.next_pieces.append(self.randomizer.next())
+        self.spawn(self.next_pieces.pop(0))
+
+    def spawn(self, piece):
+        # the falling piece is four ints: id, rotation and box position
+        self.piece = piece
+        self.rotation = SPAWN_ROTATION[self.piece]
+        self.x = spawn_x(self.piece, self.width)
+        self.y = SPAWN_Y[self.piece]
+        if not self.valid_move(self.piece, self.rotation, self.x, self.y):
+            self.game_over = True
+
+    def valid_move(self, piece, rotation, x, y):
+        return not self.board.collides(MASKS[piece][rotation], x, y)
+
+    def move(self, dx, dy):
+        new_x = self.x + dx
+        new_y = self.y + dy
+        if self.valid_move(self.piece, self.rotation, new_x, new_y):
+            self.x = new_x
+            self.y = new_y
+            return True
+        return False
+
+    def rotate(self, turn=0):
+        # SRS kicks are tried in order, see pieces.KICKS
+        rotated = try_rotate(self.board, self.piece, self.rotation, self.x, self.y, turn)
+        if rotated:
+            self.rotation, self.x, self.y = rotated
+            return True
+        return False
+
+    def drop_distance(self):
+        """Rows the piece can fall.  From the board's column tops this is
+        one lookup per piece column; only a piece tucked under an overhang
+        (below the top of one of its columns) needs the row by row scan."""
+        tops = self.board.tops
+        x, y = self.x, self.y
+        distance = self.height
+        for dx, dy in BOTTOMS[self.piece][self.rotation]:
+            top = tops[x + dx]
+            if y + dy > top:
+                return self.scan_drop_distance()
+            if top - 1 - dy - y < distance:
+                distance = top - 1 - dy - y
+        return distance
+
+    def scan_drop_distance(self):
+        distance = 0
+        while self.valid_move(self.piece, self.rotation, self.x, self.y + distance + 1):
+            distance += 1
+        return distance
+
+    def hold(self):
+        """Swap the falling piece with the hold slot, once per piece."""
+        if self.hold_used:
+            return False
+        self.hold_used = True
+        held = self.hold_piece
+        self.hold_piece = self.piece
+        if held is None:
+            self.new_piece()
+        else:
+            self.spawn(held)
+        return True
+
+    def lock_piece(self):
+        piece, rotation, x, y = self.piece, self.rotation, self.x, self.y
+        self.board.place(MASKS[piece][rotation], x, y, piece + 1)
+        self.score += 1  # Increment score by 1 for each placed piece
+        self.pieces += 1
+        cleared = self.clear_lines(range(y + MIN_DY[piece][rotation],
+                                         y + MAX_DY[piece][rotation] + 1))
+        self.last_lock = (piece, rotation, x, y, cleared)
+        self.hold_used = False
+        self.new_piece()
+        return cleared
+
+    def clear_lines(self, touched=None):
+        # returns the cleared row indices, for scoring and animations
+        cleared = self.board.clear_lines(touched)
+        self.score += len(cleared) ** 2 * 100
+        self.lines += len(cleared)
+        return cleared
+
+    def step(self, action):
+        """Apply one action; returns NOTHING, MOVED or LOCKED."""
+        if self.game_over:
+            return NOTHING
+        if action == LEFT:
+            return MOVED if self.move(-1, 0) else NOTHING
+        if action == RIGHT:
+            return MOVED if self.move(1, 0) else NOTHING
+        if action == DOWN:
+            return MOVED if self.move(0, 1) else NOTHING
+        if action == ROTATE_CW:
+            return MOVED if self.rotate(0) else NOTHING
+        if action == ROTATE_CCW:
+            return MOVED if self.rotate(1) else NOTHING
+        if action == HARD_DROP:
+            self.y += self.drop_distance()
+            self.lock_piece()
+            return LOCKED
+        if action == GRAVITY:
+            if self.move(0, 1):
+                return MOVED
+            self.lock_piece()
+            return LOCKED
+        if action == HOLD:
+            return MOVED if self.hold() else NOTHING
+        raise ValueError(f"unknown action {action}")
@@ -0,0 +1,214 @@
+"""Tetris high scores, kept in the user's data folder.
+
+The table is a small JSON file with the best TABLE_SIZE games: score,
+lines, pieces, date, seed and the replay file of each.  The game in
+progress is written as soon as it gets into the table and again every
+time it moves up a place.  Other score changes of a game in the table
+(like a new record while it is already first) are written at most once
+every SAVE_INTERVAL seconds, and close() writes the final numbers, so a
+crash loses at most about a second of points.  The replay file is only
+referenced once it has been saved (set_replay()), so the table never
+points to a file that does not exist.
+
+Writes happen on a background thread: the table is turned into text on
+the caller's side (a few microseconds) and the thread writes it to a
+temporary file, fsyncs it and renames it over the old one, so the frame
+loop never waits for the disk and the file is always either the old
+table or the new one.  When several writes queue up only the newest is
+written.
+
+    python highscores.py     print the table
+"""
+import json
+import os
+import pickle
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+TABLE_SIZE = 10
+SAVE_INTERVAL = 1.0  # seconds between writes while the game keeps its place
+FILE_NAME = "highscores.json"
+
+
+def data_dir():
+    """Per-user folder for the game's files; TETRIS_DATA_DIR overrides it."""
+    if os.environ.get("TETRIS_DATA_DIR"):
+        return os.environ["TETRIS_DATA_DIR"]
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser(os.path.join("~", "AppData", "Roaming"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser(os.path.join("~", "Library", "Application Support"))
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser(os.path.join("~", ".local", "share"))
+    return os.path.join(base, "JuegosV1", "tetris")
+
+
+def write_atomic(path, text):
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, temp = tempfile.mkstemp(prefix=".highscores-", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    # the rename only survives a power cut once the folder is synced too
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def read_legacy(paths):
+    """Best score in the old high_score.pkl files (a pickled int), or 0."""
+    best = 0
+    for path in {os.path.abspath(p) for p in paths}:
+        try:
+            with open(path, "rb") as f:
+                score = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            continue
+        if isinstance(score, int):
+            best = max(best, score)
+    return best
+
+
+class HighScores:
+    def __init__(self, path=None, size=TABLE_SIZE, legacy=(), save_interval=SAVE_INTERVAL):
+        self.path = path or os.path.join(data_dir(), FILE_NAME)
+        self.size = size
+        self.save_interval = save_interval
+        self.saved_at = 0.0  # time.monotonic() of the last queued write
+        self.queue = queue.Queue()
+        self.writer = None
+        self.current = None  # entry of the game in progress
+        self.dirty = False   # the table changed since the last queued write
+        self.entries = self.load()
+        if self.entries is None:
+            # first run with this table: bring over the old high score
+            self.entries = []
+            score = read_legacy(legacy)
+            if score:
+                self.entries.append({"score": score, "lines": None, "pieces": None,
+                                     "date": None, "seed": None, "replay": None})
+                self.save()
+
+    def load(self):
+        """The saved entries, or None if there is no table yet."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            print(f"high scores: cannot read {self.path} ({error}), starting a new table")
+            return []
+        entries = [e for e in data.get("scores", []) if isinstance(e.get("score"), int)]
+        entries.sort(key=lambda e: -e["score"])
+        return entries[:self.size]
+
+    def best(self):
+        return self.entries[0]["score"] if self.entries else 0
+
+    def qualifies(self, score):
+        return score > 0 and (len(self.entries) < self.size or score > self.entries[-1]["score"])
+
+    def start_game(self, seed=None, ai=None):
+        if self.dirty:
+            self.save()  # final numbers of the previous game
+        self.current = {"score": 0, "lines": 0, "pieces": 0,
+                        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "seed": seed, "replay": None, "ai": ai}
+
+    def rank(self):
+        for rank, entry in enumerate(self.entries):
+            if entry is self.current:
+                return rank
+        return None
+
+    def update(self, score, lines, pieces):
+        """New numbers for the game in progress.  Queues a write and returns
+        True when the game got into the table, moved up, or kept its place
+        for SAVE_INTERVAL since the last write; never waits for the disk."""
+        current = self.current
+        if current is None or score == current["score"]:
+            return False
+        old_rank = self.rank()
+        current.update(score=score, lines=lines, pieces=pieces)
+        if old_rank is None:
+            if not self.qualifies(score):
+                return False
+            self.entries.append(current)
+        # stable sort: on a tie the older game keeps its place
+        self.entries.sort(key=lambda e: -e["score"])
+        del self.entries[self.size:]
+        if self.rank() == old_rank and time.monotonic() - self.saved_at < self.save_interval:
+            self.dirty = True
+            return False
+        self.save()
+        return True
+
+    def set_replay(self, path):
+        """Point the game in progress to its replay, once the file exists."""
+        if self.current is not None:
+            self.current["replay"] = path
+            if self.rank() is not None:
+                self.dirty = True
+
+    def save(self):
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        text = json.dumps({"version": 1, "scores": self.entries}, indent=1)
+        self.queue.put(text)
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_loop, name="highscores", daemon=True)
+            self.writer.start()
+
+    def write_loop(self):
+        stop = False
+        while not stop:
+            texts = [self.queue.get()]
+            while True:
+                try:
+                    texts.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in texts
+            texts = [text for text in texts if text is not None]
+            if texts:
+                try:
+                    write_atomic(self.path, texts[-1])
+                except OSError as error:
+                    print(f"high scores: cannot write {self.path} ({error})")
+
+    def close(self, timeout=5.0):
+        """Write the final numbers and finish the pending writes (at exit)."""
+        if self.dirty:
+            self.save()
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join(timeout)
+            self.writer = None
+
+
+if __name__ == "__main__":
+    scores = HighScores()
+    print(scores.path)
+    for rank, entry in enumerate(scores.entries, 1):
+        lines = "?" if entry["lines"] is None else entry["lines"]
+        replay = os.path.basename(entry["replay"]) if entry.get("replay") else ""
+        print(f"{rank:2d}. {entry['score']:8d}  {lines:>5} lines  {entry['date'] or 'old':19s}  {replay}")
+    if not scores.entries:
+        print("no games yet")
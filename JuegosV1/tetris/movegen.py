@@ -0,0 +1,141 @@
+"""Move generator: every place a piece can reach, with the inputs to get there.
+
+A breadth-first search over (rotation, x, y) states starting at the spawn
+state, using the same rules as the engine: one column left or right,
+one row down, and clockwise / counterclockwise turns with the SRS kicks
+of pieces.try_rotate.  From any state a hard drop ends the piece, so
+every state also yields the resting position straight below it.  Since
+the search is breadth first, the first time a resting position shows up
+it comes with the shortest input sequence; positions that cover the same
+cells (O in any rotation, the two horizontal states of I, S and Z) count
+once.
+
+Unlike dropping from above (ai.py) this finds tucks under overhangs,
+slides along the stack and kicked spins.
+
+    python movegen.py                      perft counts on an empty board
+    python movegen.py --depth 3 --seed 4   perft over a seeded piece order
+"""
+import argparse
+import random
+import time
+from collections import deque
+
+from bitboard import Bitboard, WALL
+from engine import DOWN, HARD_DROP, LEFT, RIGHT, ROTATE_CCW, ROTATE_CW
+from pieces import (CLOCKWISE, COUNTERCLOCKWISE, MASKS, MIN_DY, NAMES, PIECE_COUNT,
+                    SPAWN_ROTATION, SPAWN_Y, spawn_x, try_rotate)
+
+
+def generate(board, piece, rotation=None, x=None, y=None):
+    """All distinct resting positions of `piece` reachable from its spawn
+    state (or from the given state).
+
+    Returns a list of (rotation, x, y, actions) where actions is the
+    shortest list of engine actions, ending with HARD_DROP.  Empty if the
+    start state is blocked.
+    """
+    if rotation is None:
+        rotation = SPAWN_ROTATION[piece]
+        x = spawn_x(piece, board.width)
+        y = SPAWN_Y[piece]
+    collides = board.collides
+    masks = MASKS[piece]
+    start = (rotation, x, y)
+    if collides(masks[rotation], x, y):
+        return []
+
+    parents = {start: None}
+    landings = {}
+    found = {}
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        r, sx, sy = state
+        piece_masks = masks[r]
+
+        # where a hard drop from here ends; shared by the whole column
+        column = []
+        ly = sy
+        while True:
+            known = landings.get((r, sx, ly))
+            if known is not None:
+                ly = known
+                break
+            column.append(ly)
+            if collides(piece_masks, sx, ly + 1):
+                break
+            ly += 1
+        for cy in column:
+            landings[(r, sx, cy)] = ly
+
+        shift = sx + WALL
+        key = (ly + MIN_DY[piece][r],) + tuple(mask << shift for _, mask in piece_masks)
+        if key not in found:
+            found[key] = (state, (r, sx, ly))
+
+        for action, new in ((LEFT, (r, sx - 1, sy)), (RIGHT, (r, sx + 1, sy)),
+                            (DOWN, (r, sx, sy + 1))):
+            if new not in parents and not collides(piece_masks, new[1], new[2]):
+                parents[new] = (state, action)
+                queue.append(new)
+        for action, turn in ((ROTATE_CW, CLOCKWISE), (ROTATE_CCW, COUNTERCLOCKWISE)):
+            new = try_rotate(board, piece, r, sx, sy, turn)
+            if new is not None and new not in parents:
+                parents[new] = (state, action)
+                queue.append(new)
+
+    results = []
+    for state, (r, rx, ry) in found.values():
+        actions = [HARD_DROP]
+        while parents[state] is not None:
+            state, action = parents[state]
+            actions.append(action)
+        actions.reverse()
+        results.append((r, rx, ry, actions))
+    return results
+
+
+def after(board, piece, rotation, x, y):
+    """A new board (rows only) with the piece locked and full rows cleared."""
+    child = Bitboard(board.width, board.height)
+    rows = list(board.rows)
+    shift = x + WALL
+    for dy, mask in MASKS[piece][rotation]:
+        if y + dy >= 0:
+            rows[y + dy] |= mask << shift
+    kept = [row for row in rows if row != board.full_row]
+    child.rows = [board.empty_row] * (len(rows) - len(kept)) + kept
+    child.reset_tops()
+    return child
+
+
+def perft(board, pieces):
+    """Number of distinct placement sequences for the pieces in order."""
+    placements = generate(board, pieces[0])
+    if len(pieces) == 1:
+        return len(placements)
+    return sum(perft(after(board, pieces[0], r, x, y), pieces[1:])
+               for r, x, y, _ in placements)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perft counts for the Tetris move generator")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, help="random piece order instead of every piece")
+    args = parser.parse_args()
+
+    board = Bitboard()
+    for piece in range(PIECE_COUNT):
+        print(f"{NAMES[piece]}: {len(generate(board, piece))} placements on an empty board")
+
+    if args.seed is not None:
+        rng = random.Random(args.seed)
+        orders = [[rng.randrange(PIECE_COUNT) for _ in range(args.depth)]]
+    else:
+        orders = [[piece] * args.depth for piece in range(PIECE_COUNT)]
+    for order in orders:
+        start = time.perf_counter()
+        count = perft(board, order)
+        elapsed = time.perf_counter() - start
+        print(f"perft {''.join(NAMES[p] for p in order)}: {count} ({elapsed:.2f} s)")
@@ -0,0 +1,136 @@
+"""Precomputed Tetris pieces: rotation states, cells, row masks and kicks.
+
+Pieces are integer ids in the order of the original SHAPES list
+(I, O, T, L, J, Z, S) and a piece on the board is just four ints
+(piece, rotation, x, y), where (x, y) is the top-left corner of the
+piece's SRS bounding box.  Rotation 1 is a clockwise turn from 0.
+
+Everything below is built once at import, so rotating is a table lookup
+plus a few mask tests.  Spawn states are chosen so the pieces appear the
+way the old shape lists did.
+"""
+from bitboard import shape_masks
+
+I, O, T, L, J, Z, S = range(7)
+PIECE_COUNT = 7
+NAMES = "IOTLJZS"
+
+# rotation state 0 of each piece inside its SRS box
+_SPAWN_BOXES = [
+    ["....", "####", "....", "...."],
+    ["##", "##"],
+    [".#.", "###", "..."],
+    ["..#", "###", "..."],
+    ["#..", "###", "..."],
+    ["##.", ".##", "..."],
+    [".##", "##.", "..."],
+]
+
+
+def _rotate_clockwise(box):
+    return ["".join(row[x] for row in reversed(box)) for x in range(len(box))]
+
+
+def _build():
+    cells, masks, boxes = [], [], []
+    for box in _SPAWN_BOXES:
+        piece_cells, piece_masks, piece_boxes = [], [], []
+        for rotation in range(4):
+            shape = [[1 if c == "#" else 0 for c in row] for row in box]
+            piece_boxes.append(shape)
+            piece_cells.append(tuple((x, y) for y, row in enumerate(shape)
+                                     for x, cell in enumerate(row) if cell))
+            piece_masks.append(tuple(shape_masks(shape)))
+            box = _rotate_clockwise(box)
+        cells.append(tuple(piece_cells))
+        masks.append(tuple(piece_masks))
+        boxes.append(tuple(piece_boxes))
+    return tuple(cells), tuple(masks), tuple(boxes)
+
+
+# CELLS[piece][rotation] -> ((dx, dy), ...)
+# MASKS[piece][rotation] -> ((dy, row mask), ...)
+# SHAPES[piece][rotation] -> rows of 0/1, handy for drawing previews
+CELLS, MASKS, SHAPES = _build()
+
+# leftmost / rightmost / top / bottom occupied offset of every rotation
+MIN_DX = tuple(tuple(min(x for x, _ in c) for c in rotations) for rotations in CELLS)
+MAX_DX = tuple(tuple(max(x for x, _ in c) for c in rotations) for rotations in CELLS)
+MIN_DY = tuple(tuple(min(y for _, y in c) for c in rotations) for rotations in CELLS)
+MAX_DY = tuple(tuple(max(y for _, y in c) for c in rotations) for rotations in CELLS)
+
+
+def _bottoms():
+    # BOTTOMS[piece][rotation] -> ((dx, lowest dy in that column), ...)
+    bottoms = []
+    for rotations in CELLS:
+        piece_bottoms = []
+        for cells in rotations:
+            low = {}
+            for dx, dy in cells:
+                low[dx] = max(low.get(dx, dy), dy)
+            piece_bottoms.append(tuple(sorted(low.items())))
+        bottoms.append(tuple(piece_bottoms))
+    return tuple(bottoms)
+
+
+BOTTOMS = _bottoms()
+
+# spawn rotation and box row; the flat side of
+# T, L, J, S and Z faces up like the original shapes (SRS state 2)
+SPAWN_ROTATION = (0, 0, 2, 2, 2, 2, 2)
+SPAWN_Y = (-1, 0, -1, -1, -1, -1, -1)
+
+
+def spawn_x(piece, width=10):
+    return width // 2 - len(_SPAWN_BOXES[piece]) // 2
+
+
+# SRS wall kicks, (dx, dy) with y pointing down, tried in order.
+# KICKS[piece][rotation][turn] where turn 0 is clockwise, 1 counterclockwise
+_JLSTZ = {
+    (0, 1): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],
+    (1, 0): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],
+    (1, 2): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],
+    (2, 1): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],
+    (2, 3): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],
+    (3, 2): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],
+    (3, 0): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],
+    (0, 3): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],
+}
+_I = {
+    (0, 1): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],
+    (1, 0): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],
+    (1, 2): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)],
+    (2, 1): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],
+    (2, 3): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],
+    (3, 2): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],
+    (3, 0): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],
+    (0, 3): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)],
+}
+
+
+def _kicks(table):
+    # the SRS tables use y up, the board uses y down
+    return tuple(
+        tuple(tuple((dx, -dy) for dx, dy in table[(rotation, (rotation + step) % 4)])
+              for step in (1, 3))
+        for rotation in range(4))
+
+
+_NO_KICKS = tuple(((((0, 0),),) * 2) for _ in range(4))
+KICKS = tuple(_kicks(_I) if piece == I else _NO_KICKS if piece == O else _kicks(_JLSTZ)
+              for piece in range(PIECE_COUNT))
+
+CLOCKWISE = 0
+COUNTERCLOCKWISE = 1
+
+
+def try_rotate(board, piece, rotation, x, y, turn=CLOCKWISE):
+    """Rotate with kicks; returns (rotation, x, y) or None if blocked."""
+    new_rotation = (rotation + (1 if turn == CLOCKWISE else 3)) % 4
+    masks = MASKS[piece][new_rotation]
+    for dx, dy in KICKS[piece][rotation][turn]:
+        if not board.collides(masks, x + dx, y + dy):
+            return new_rotation, x + dx, y + dy
+    return None
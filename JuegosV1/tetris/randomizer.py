@@ -0,0 +1,64 @@
+"""Piece generators for Tetris, seeded and deterministic.
+
+All modes draw from a small 64-bit LCG whose whole state is one int, so
+a game is reproduced from its seed alone and the generator does not
+touch the global `random` module.
+
+    bag      7-bag: every run of 7 pieces holds each piece once
+    classic  NES style: roll 0-7, on 7 or a repeat roll 0-6 once more
+    random   uniform, streaks are unbounded
+
+    randomizer = Randomizer(seed=1234)
+    pieces = [randomizer.next() for _ in range(14)]
+"""
+import random
+
+from pieces import PIECE_COUNT
+
+MODES = ("bag", "classic", "random")
+_MASK = (1 << 64) - 1
+_MULTIPLIER = 6364136223846793005
+_INCREMENT = 1442695040888963407
+
+
+class Randomizer:
+    def __init__(self, seed=None, mode="bag"):
+        if mode not in MODES:
+            raise ValueError(f"unknown randomizer mode {mode!r}")
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        self.seed = seed
+        self.mode = mode
+        self.state = seed & _MASK
+        self.bag = []
+        self.last = None
+
+    def getstate(self):
+        return self.state, tuple(self.bag), self.last
+
+    def setstate(self, state):
+        self.state, bag, self.last = state
+        self.bag = list(bag)
+
+    def randbelow(self, n):
+        self.state = (self.state * _MULTIPLIER + _INCREMENT) & _MASK
+        # the high bits of an LCG are the good ones
+        return ((self.state >> 32) * n) >> 32
+
+    def next(self):
+        if self.mode == "bag":
+            if not self.bag:
+                bag = list(range(PIECE_COUNT))
+                for i in range(PIECE_COUNT - 1, 0, -1):
+                    j = self.randbelow(i + 1)
+                    bag[i], bag[j] = bag[j], bag[i]
+                self.bag = bag
+            piece = self.bag.pop()
+        elif self.mode == "classic":
+            piece = self.randbelow(PIECE_COUNT + 1)
+            if piece == PIECE_COUNT or piece == self.last:
+                piece = self.randbelow(PIECE_COUNT)
+        else:
+            piece = self.randbelow(PIECE_COUNT)
+        self.last = piece
+        return piece
@@ -0,0 +1,314 @@
+"""Tetris replays: the seed plus a timestamped stream of engine actions.
+
+File layout (little endian):
+
+    header     magic "TRPL", version, width, height, seed, randomizer mode,
+               preview
+    actions    one varint per action: (milliseconds since the previous
+               action << 3) | action, so most actions take one byte
+    keyframes  zlib-compressed engine states, one every KEYFRAME_EVERY
+               actions, so a seek replays at most that many actions
+    index      (action count, time, file offset) of every keyframe
+    trailer    index offset, counts, final score / lines / pieces,
+               duration, crc32 of the final board, magic "TRPE"
+
+Only actions that changed the game are recorded; the engine is
+deterministic for a given seed, so they are all a replay needs.
+
+    python replay.py verify game.trp          re-simulate and check
+    python replay.py verify replays/          a whole folder, on all cores
+    python replay.py play game.trp --speed 4  watch it (left/right seek 10 s)
+"""
+import argparse
+import bisect
+import glob
+import importlib.util
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import WALL
+from engine import NOTHING, TetrisEngine
+from randomizer import MODES, Randomizer
+
+MAGIC = b"TRPL"
+END_MAGIC = b"TRPE"
+VERSION = 1
+KEYFRAME_EVERY = 200
+HEADER = struct.Struct("<4sHBBQBB")
+STATE = struct.Struct("<IIQIIbbbbb?QbB")
+INDEX = struct.Struct("<IIQ")
+TRAILER = struct.Struct("<QIIQIIII4s")
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varints(data, start, end):
+    values = []
+    value = shift = 0
+    for i in range(start, end):
+        byte = data[i]
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def board_crc(engine):
+    return zlib.crc32(b"".join(engine.board.colors))
+
+
+def pack_state(engine, actions, ms):
+    state, bag, last = engine.randomizer.getstate()
+    hold = -1 if engine.hold_piece is None else engine.hold_piece
+    head = STATE.pack(actions, ms, engine.score, engine.lines, engine.pieces,
+                      engine.piece, engine.rotation, engine.x, engine.y, hold, engine.hold_used,
+                      state, -1 if last is None else last, len(bag))
+    return zlib.compress(head + bytes(bag) + bytes(engine.next_pieces) +
+                         b"".join(engine.board.colors))
+
+
+def unpack_state(engine, blob):
+    """Load a keyframe into `engine`; returns (action count, ms)."""
+    data = zlib.decompress(blob)
+    (actions, ms, engine.score, engine.lines, engine.pieces,
+     engine.piece, engine.rotation, engine.x, engine.y, hold, engine.hold_used,
+     state, last, bag_size) = STATE.unpack_from(data)
+    offset = STATE.size
+    bag = data[offset:offset + bag_size]
+    offset += bag_size
+    engine.next_pieces = list(data[offset:offset + engine.preview])
+    offset += engine.preview
+    engine.hold_piece = None if hold < 0 else hold
+    engine.randomizer.setstate((state, tuple(bag), None if last < 0 else last))
+    engine.game_over = False
+    board = engine.board
+    board.colors = [bytearray(data[offset + y * board.width:offset + (y + 1) * board.width])
+                    for y in range(board.height)]
+    board.rows = [board.empty_row] * board.height
+    for y, colors in enumerate(board.colors):
+        for x, color in enumerate(colors):
+            if color:
+                board.rows[y] |= 1 << (x + WALL)
+    board.reset_tops()
+    return actions, ms
+
+
+class Recorder:
+    """Collects the actions of one game; save() writes the file."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.stream = bytearray()
+        self.keyframes = []  # (actions, ms, blob)
+        self.count = 0
+        self.last_ms = 0
+
+    def record(self, action, ms):
+        ms = max(ms, self.last_ms)
+        write_varint(self.stream, (ms - self.last_ms) << 3 | action)
+        self.last_ms = ms
+        self.count += 1
+        if self.count % KEYFRAME_EVERY == 0:
+            self.keyframes.append((self.count, ms, pack_state(self.engine, self.count, ms)))
+
+    def save(self, path):
+        engine = self.engine
+        out = bytearray(HEADER.pack(MAGIC, VERSION, engine.width, engine.height,
+                                    engine.seed & (1 << 64) - 1, MODES.index(engine.randomizer.mode),
+                                    engine.preview))
+        out += self.stream
+        index = bytearray()
+        for actions, ms, blob in self.keyframes:
+            index += INDEX.pack(actions, ms, len(out))
+            out += struct.pack("<I", len(blob)) + blob
+        index_offset = len(out)
+        out += index
+        out += TRAILER.pack(index_offset, len(self.keyframes), self.count, engine.score,
+                            engine.lines, engine.pieces, self.last_ms, board_crc(engine), END_MAGIC)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(out)
+        return path
+
+
+class Replay:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        self.path = path
+        magic, version, self.width, self.height, self.seed, mode, self.preview = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a replay file")
+        (index_offset, keyframe_count, self.count, self.score, self.lines, self.pieces,
+         self.duration, self.crc, end) = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+        if end != END_MAGIC:
+            raise ValueError(f"{path}: truncated replay")
+        self.mode = MODES[mode]
+        self.data = data
+
+        self.keyframes = [INDEX.unpack_from(data, index_offset + i * INDEX.size)
+                          for i in range(keyframe_count)]
+        stream_end = self.keyframes[0][2] if self.keyframes else index_offset
+        self.actions = []
+        self.times = []
+        ms = 0
+        for value in read_varints(data, HEADER.size, stream_end):
+            ms += value >> 3
+            self.actions.append(value & 7)
+            self.times.append(ms)
+        if len(self.actions) != self.count:
+            raise ValueError(f"{path}: action stream is damaged")
+
+    def new_engine(self):
+        return TetrisEngine(self.width, self.height, preview=self.preview,
+                            randomizer=Randomizer(self.seed, self.mode))
+
+    def keyframe(self, number):
+        actions, ms, offset = self.keyframes[number]
+        size, = struct.unpack_from("<I", self.data, offset)
+        return self.data[offset + 4:offset + 4 + size]
+
+    def seek(self, engine, ms):
+        """Put `engine` in the state at time `ms`; returns the action count.
+        Starts from the closest keyframe before, so at most
+        KEYFRAME_EVERY actions are simulated."""
+        done = bisect.bisect_right(self.times, ms)
+        number = bisect.bisect_right([k[0] for k in self.keyframes], done) - 1
+        if number >= 0:
+            start, _ = unpack_state(engine, self.keyframe(number))
+        else:
+            engine.randomizer = Randomizer(self.seed, self.mode)
+            engine.reset()
+            start = 0
+        step = engine.step
+        for action in self.actions[start:done]:
+            step(action)
+        return done
+
+
+def verify(path):
+    """Re-simulate a replay; returns (path, ok, message, actions, game ms)."""
+    try:
+        replay = Replay(path)
+    except (OSError, ValueError, struct.error, IndexError) as error:
+        return path, False, str(error), 0, 0
+    engine = replay.new_engine()
+    step = engine.step
+    keyframes = {actions: number for number, (actions, _, _) in enumerate(replay.keyframes)}
+    for i, action in enumerate(replay.actions, 1):
+        if step(action) == NOTHING:
+            return path, False, f"action {i} changed nothing", i, replay.duration
+        if i in keyframes:
+            check = replay.new_engine()
+            unpack_state(check, replay.keyframe(keyframes[i]))
+            if (check.board.rows != engine.board.rows or check.score != engine.score
+                    or check.piece != engine.piece or check.next_pieces != engine.next_pieces):
+                return path, False, f"keyframe at action {i} does not match", i, replay.duration
+    final = (engine.score, engine.lines, engine.pieces, board_crc(engine))
+    if final != (replay.score, replay.lines, replay.pieces, replay.crc):
+        return path, False, "final state does not match", replay.count, replay.duration
+    return path, True, f"score {engine.score}, {engine.lines} lines", replay.count, replay.duration
+
+
+def verify_all(paths, workers=None):
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(verify, paths, chunksize=4))
+
+
+def load_game_module():
+    # tetrisV1.2.py has dots in its name, so it cannot be imported by name
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tetrisV1.2.py")
+    spec = importlib.util.spec_from_file_location("tetris_game", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def play(path, speed=1.0):
+    """Watch a replay; left/right seek 10 s, up/down change the speed, space pauses."""
+    import pygame
+    replay = Replay(path)
+    game_module = load_game_module()
+    game = game_module.Tetris(seed=replay.seed, mode=replay.mode, preview=replay.preview)
+    engine = game.engine
+    pygame.display.set_caption(f"Tetris replay: {os.path.basename(path)}")
+    clock = pygame.time.Clock()
+    done = 0
+    game_ms = 0.0
+    paused = False
+    last = time.perf_counter()
+    while done <= replay.count:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    game_ms = max(0.0, game_ms + (10000 if event.key == pygame.K_RIGHT else -10000))
+                    done = replay.seek(engine, game_ms)
+                    game.rebuild_stack()
+                elif event.key == pygame.K_UP:
+                    speed *= 2
+                elif event.key == pygame.K_DOWN:
+                    speed /= 2
+                elif event.key == pygame.K_SPACE:
+                    paused = not paused
+        now = time.perf_counter()
+        if not paused:
+            game_ms += (now - last) * 1000 * speed
+        last = now
+        while done < replay.count and replay.times[done] <= game_ms:
+            game.step(replay.actions[done])
+            done += 1
+        if done == replay.count and game_ms > replay.duration + 2000:
+            break
+
+        game.screen.fill(game_module.BLACK)
+        game.draw_grid()
+        game.draw_ghost()
+        game.draw_piece()
+        game.draw_score()
+        game.draw_queue()
+        info = game.font.render(f"x{speed:g}  {game_ms / 1000:6.1f} s", True, game_module.WHITE)
+        game.screen.blit(info, (game_module.BLOCK_SIZE * (game_module.GRID_WIDTH + 0.5), 10))
+        pygame.display.flip()
+        clock.tick(60)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or watch Tetris replays")
+    parser.add_argument("command", choices=["verify", "play"])
+    parser.add_argument("path", help="replay file, or a folder of them for verify")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.command == "play":
+        play(args.path, args.speed)
+    else:
+        if os.path.isdir(args.path):
+            paths = sorted(glob.glob(os.path.join(args.path, "*.trp")))
+        else:
+            paths = [args.path]
+        start = time.perf_counter()
+        results = verify_all(paths, args.workers) if len(paths) > 1 else [verify(paths[0])]
+        elapsed = time.perf_counter() - start
+        for path, ok, message, _, _ in results:
+            print(f"{'ok  ' if ok else 'FAIL'} {os.path.basename(path)}: {message}")
+        game_time = sum(ms for *_, ms in results) / 1000
+        print(f"{sum(ok for _, ok, *_ in results)}/{len(results)} ok, "
+              f"{game_time:.0f} s of play verified in {elapsed:.2f} s "
+              f"({game_time / max(elapsed, 1e-9):.0f}x real time)")
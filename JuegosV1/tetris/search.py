@@ -0,0 +1,201 @@
+"""Lookahead search for the Tetris AI.
+
+The known pieces (the falling one plus the preview queue) are searched
+with a beam: every placement of the first piece is expanded, the best
+`beam_width` boards by heuristic value are kept and expanded with the
+next known piece, and so on.  Past the end of the queue the kept boards
+get an expectimax estimate: the average, over the seven pieces that
+could come next, of the best placement of that piece.
+
+A board's value is the placement part of the ai.py score (landing height,
+eroded cells) summed along the path plus the board features of the last
+board.  Board values and expectimax values are memoized by the rows
+tuple, so a board reached along two paths (a transposition) is evaluated
+once.  Searches stop at a node or time budget and use what they have:
+the budget is checked for every placement, in the expectimax too, and
+an expectimax cut short is neither memoized nor trusted, the move comes
+from the beam entries that were fully estimated.
+
+    python search.py --games 8 --pieces 500 --preview 2 --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ai import WEIGHTS, AIPlayer, PlacementAI
+from engine import TetrisEngine
+from pieces import PIECE_COUNT
+
+TOPPED_OUT = -1e9
+
+
+class Search:
+    def __init__(self, board, weights=WEIGHTS, beam_width=6, expect_depth=1,
+                 node_budget=None, time_budget=None, table_size=200_000):
+        self.ai = PlacementAI(board, weights)
+        self.landing_weight, self.eroded_weight = weights[0], weights[1]
+        self.beam_width = beam_width
+        self.expect_depth = expect_depth
+        self.node_budget = node_budget
+        self.time_budget = time_budget
+        self.table_size = table_size
+        self.values = {}     # rows tuple -> board value
+        self.expected = {}   # (rows tuple, depth) -> expectimax value
+        self.nodes = 0
+        self.hits = 0
+        self.deadline = None
+        self.aborted = False
+
+    def out_of_budget(self):
+        if self.node_budget is not None and self.nodes >= self.node_budget:
+            return True
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def board_value(self, rows, key):
+        value = self.values.get(key)
+        if value is None:
+            value = self.ai.evaluate(rows)
+            self.values[key] = value
+        else:
+            self.hits += 1
+        return value
+
+    def expectation(self, rows, depth):
+        """Average over the next piece of its best placement value.  Out of
+        budget it sets `aborted` and returns the partial average, which
+        is not memoized."""
+        key = (tuple(rows), depth)
+        value = self.expected.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        total = 0.0
+        for piece in range(PIECE_COUNT):
+            best = TOPPED_OUT
+            for rotation, x, y, new_rows, lines, eroded, landing in self.ai.placements(rows, piece):
+                if self.out_of_budget():
+                    self.aborted = True
+                    return total / max(piece, 1)
+                self.nodes += 1
+                value = self.landing_weight * landing + self.eroded_weight * eroded
+                if depth > 1:
+                    value += self.expectation(new_rows, depth - 1)
+                    if self.aborted:
+                        return value
+                else:
+                    value += self.board_value(new_rows, tuple(new_rows))
+                if value > best:
+                    best = value
+            total += best
+        value = total / PIECE_COUNT
+        self.expected[key] = value
+        return value
+
+    def search(self, rows, pieces):
+        """Best (value, (rotation, x)) for pieces[0]; None if every move tops out."""
+        if len(self.values) > self.table_size:
+            self.values.clear()
+        if len(self.expected) > self.table_size:
+            self.expected.clear()
+        self.nodes = 0
+        self.hits = 0
+        self.deadline = None
+        self.aborted = False
+        if self.time_budget is not None:
+            self.deadline = time.perf_counter() + self.time_budget
+
+        # beam entries: (value, path value, first move, rows)
+        beam = [(0.0, 0.0, None, rows)]
+        for depth, piece in enumerate(pieces):
+            candidates = {}
+            for _, path_value, first, beam_rows in beam:
+                if depth and self.out_of_budget():
+                    # a level cut short depends on which nodes came first:
+                    # keep the last complete one
+                    candidates = None
+                    break
+                for rotation, x, y, new_rows, lines, eroded, landing in self.ai.placements(beam_rows, piece):
+                    self.nodes += 1
+                    key = tuple(new_rows)
+                    total = path_value + self.landing_weight * landing + self.eroded_weight * eroded
+                    value = total + self.board_value(new_rows, key)
+                    # transpositions keep their best path only
+                    if key not in candidates or value > candidates[key][0]:
+                        candidates[key] = (value, total, first or (rotation, x), new_rows)
+            if not candidates:
+                break
+            beam = sorted(candidates.values(), key=lambda c: c[0], reverse=True)[:self.beam_width]
+            if self.out_of_budget():
+                break
+        if beam[0][2] is None:
+            return None
+
+        best = None
+        if self.expect_depth:
+            for _, path_value, first, beam_rows in beam:
+                if self.out_of_budget():
+                    break
+                value = path_value + self.expectation(beam_rows, self.expect_depth)
+                if self.aborted:
+                    break
+                if best is None or value > best[0]:
+                    best = (value, first)
+        if best is None:
+            best = (beam[0][0], beam[0][2])
+        return best
+
+    def best_move(self, rows, pieces):
+        found = self.search(rows, pieces)
+        return found and found[1]
+
+
+def play_game(seed, max_pieces, preview=1, beam_width=6, expect_depth=1,
+              node_budget=None, time_budget=None):
+    """One headless game with the search; returns (lines, pieces, score)."""
+    engine = TetrisEngine(seed=seed, preview=preview)
+    search = Search(engine.board, beam_width=beam_width, expect_depth=expect_depth,
+                    node_budget=node_budget, time_budget=time_budget)
+    player = AIPlayer(engine, search=search)
+    while not engine.game_over and engine.pieces < max_pieces:
+        player.play_piece()
+    return engine.lines, engine.pieces, engine.score
+
+
+def analyse(seeds, max_pieces, workers=None, **options):
+    """Offline analysis: one game per seed on all cores."""
+    seeds = list(seeds)
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(play_game, seed, max_pieces, **options) for seed in seeds]
+        return [future.result() for future in futures]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tetris lookahead search, offline")
+    parser.add_argument("--games", type=int, default=8)
+    parser.add_argument("--pieces", type=int, default=500, help="piece limit per game")
+    parser.add_argument("--preview", type=int, default=1, help="known next pieces")
+    parser.add_argument("--beam", type=int, default=6)
+    parser.add_argument("--expect", type=int, default=1, help="expectimax depth past the queue")
+    parser.add_argument("--nodes", type=int, help="node budget per move")
+    parser.add_argument("--ms", type=float, help="time budget per move (ms)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    # one move first, to show what a search costs
+    engine = TetrisEngine(seed=0, preview=args.preview)
+    search = Search(engine.board, beam_width=args.beam, expect_depth=args.expect)
+    start = time.perf_counter()
+    search.search(engine.board.rows, [engine.piece] + engine.next_pieces)
+    print(f"first move: {search.nodes} nodes in {1000 * (time.perf_counter() - start):.1f} ms")
+
+    start = time.perf_counter()
+    results = analyse(range(args.games), args.pieces, args.workers, preview=args.preview,
+                      beam_width=args.beam, expect_depth=args.expect, node_budget=args.nodes,
+                      time_budget=args.ms and args.ms / 1000)
+    elapsed = time.perf_counter() - start
+    for seed, (lines, pieces, score) in enumerate(results):
+        print(f"seed {seed}: {lines} lines, {pieces} pieces, score {score}")
+    pieces = sum(pieces for _, pieces, _ in results)
+    print(f"average {sum(lines for lines, _, _ in results) / len(results):.1f} lines, "
+          f"{pieces / elapsed:.1f} pieces/s with {args.workers} workers")
@@ -1,8 +1,14 @@
 import pygame
-import random
-import pickle
+import argparse
 import os
 import time
+from controls import ARR, DAS, GRAVITY_FRAMES, LOCK_DELAY, LOGIC_HZ, SOFT_DROP, Controller
+from highscores import HighScores, data_dir
+from engine import (DOWN, HARD_DROP, HOLD, LEFT, LOCKED, NOTHING, RIGHT, ROTATE_CCW,
+                    ROTATE_CW, TetrisEngine)
+from pieces import CELLS, MIN_DX, MIN_DY, SPAWN_ROTATION
+from randomizer import MODES
+from replay import Recorder
 
 # Initialize Pygame
 pygame.init()
@@ -26,31 +32,102 @@ GRID_HEIGHT = 20
 SCREEN_WIDTH = BLOCK_SIZE * (GRID_WIDTH + 8)
 SCREEN_HEIGHT = BLOCK_SIZE * GRID_HEIGHT
 
-# Tetromino shapes
-SHAPES = [
-    [[1, 1, 1, 1]],
-    [[1, 1], [1, 1]],
-    [[1, 1, 1], [0, 1, 0]],
-    [[1, 1, 1], [1, 0, 0]],
-    [[1, 1, 1], [0, 0, 1]],
-    [[1, 1, 0], [0, 1, 1]],
-    [[0, 1, 1], [1, 1, 0]]
-]
-
+# Frame cap; gravity, DAS and lock delay are in controls.py
+FPS = 60
+# seconds between two AI inputs with --ai, and the search time per piece
+AI_STEP = 0.05
+SEARCH_BUDGET = 0.010
+# next pieces shown in the side panel (room for 5)
+PREVIEW = 3
+MAX_PREVIEW = 5
+PREVIEW_BLOCK = BLOCK_SIZE // 2
+
+# opacity of the ghost piece (where the piece would land), 0-255
+GHOST_ALPHA = 70
+
+# every game is saved here as a replay (see replay.py); the high scores
+# (highscores.py) live in the same per-user folder
+REPLAY_DIR = os.path.join(data_dir(), "replays")
+# where older versions kept the high score: the folder it was started from
+LEGACY_HIGH_SCORES = ["high_score.pkl",
+                      os.path.join(os.path.dirname(os.path.abspath(__file__)), "high_score.pkl")]
+
+# Tetromino colors, indexed by piece id (see pieces.py)
 SHAPE_COLORS = [CYAN, YELLOW, PURPLE, BLUE, ORANGE, GREEN, RED]
 
+# Teclas -> acciones del motor
+KEY_ACTIONS = {
+    pygame.K_LEFT: LEFT,
+    pygame.K_RIGHT: RIGHT,
+    pygame.K_DOWN: DOWN,
+    pygame.K_UP: ROTATE_CW,
+    pygame.K_z: ROTATE_CCW,
+    pygame.K_SPACE: HARD_DROP,
+    pygame.K_c: HOLD,
+    pygame.K_LSHIFT: HOLD,
+}
+
+
+def make_block_sprites(size=BLOCK_SIZE, alpha=None):
+    # one pre-rendered block per color, with the 1 px gap of the grid
+    sprites = []
+    for color in SHAPE_COLORS:
+        sprite = pygame.Surface((size - 1, size - 1)).convert()
+        sprite.fill(color)
+        if alpha is not None:
+            sprite.set_alpha(alpha)
+        sprites.append(sprite)
+    return sprites
+
 
 class Tetris:
-    def __init__(self):
+    def __init__(self, fps=FPS, cpu_report=False, ai=None, seed=None, mode="bag", preview=PREVIEW,
+                 handling=None, latency=False, record=True, ghost=True):
+        self.fps = fps
+        self.cpu_report = cpu_report
+        self.latency = latency
+        self.latencies = []
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Tetris by IanThePLug")
-        self.clock = pygame.time.Clock()
-        self.grid = [[0 for _ in range(GRID_WIDTH)]
-                     for _ in range(GRID_HEIGHT)]
-        self.current_piece = self.new_piece()
+        # the rules live in engine.py; this class only draws and reads input
+        self.engine = TetrisEngine(GRID_WIDTH, GRID_HEIGHT, seed=seed, mode=mode,
+                                   preview=min(preview, MAX_PREVIEW))
+        self.recorder = Recorder(self.engine) if record else None
+        self.start_time = None
+        self.replay_path = None
+        # held keys, DAS/ARR, gravity and lock delay
+        self.controller = Controller(self.engine, step=self.step, **(handling or {}))
+        self.ai = ai
+        self.ai_player = None
+        if ai == "search":
+            from ai import AIPlayer
+            from search import Search
+            self.ai_player = AIPlayer(self.engine, search=Search(self.engine.board,
+                                                                 time_budget=SEARCH_BUDGET))
+        elif ai:
+            from ai import AIPlayer
+            self.ai_player = AIPlayer(self.engine)
         self.game_over = False
-        self.score = 0
-        self.high_score = self.load_high_score()
+        self.scores = HighScores(legacy=LEGACY_HIGH_SCORES)
+        self.high_score = self.scores.best()
+
+        # render caches: the locked stack only changes when a piece locks and
+        # the score panel only when the numbers change
+        self.font = pygame.font.Font(None, 36)
+        self.sprites = make_block_sprites()
+        self.stack_surface = pygame.Surface((GRID_WIDTH * BLOCK_SIZE, GRID_HEIGHT * BLOCK_SIZE)).convert()
+        self.rebuild_stack()
+        self.score_panel = None
+        self.score_panel_key = None
+        self.preview_sprites = make_block_sprites(PREVIEW_BLOCK)
+        self.queue_panel = None
+        self.queue_panel_key = None
+        # the landing row only changes when the piece turns, moves sideways
+        # or a new one comes, not when it falls
+        self.ghost = ghost
+        self.ghost_sprites = make_block_sprites(alpha=GHOST_ALPHA)
+        self.ghost_key = None
+        self.ghost_y = 0
 
     def pantalla_presentacion(self):
         self.screen.fill(BLACK)
@@ -70,144 +147,301 @@ class Tetris:
         self.screen.blit(text2, rect_texto2)
 
         pygame.display.flip()
-        time.sleep(3)  # Mostrar la pantalla de presentación durante 3 segundos
-
-    def new_piece(self):
-        shape = random.choice(SHAPES)
-        color = SHAPE_COLORS[SHAPES.index(shape)]
-        return {
-            'shape': shape,
-            'color': color,
-            'x': GRID_WIDTH // 2 - len(shape[0]) // 2,
-            'y': 0
-        }
+        # Mostrar la pantalla de presentación durante 3 segundos; any key
+        # skips it and the window keeps answering events meanwhile
+        end = time.perf_counter() + 3
+        while not self.game_over:
+            wait_ms = int((end - time.perf_counter()) * 1000)
+            if wait_ms <= 0:
+                break
+            event = pygame.event.wait(wait_ms)
+            if event.type == pygame.QUIT:
+                self.game_over = True
+            elif event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                break
+
+    def rebuild_stack(self):
+        # redraw the whole locked stack into the cached surface
+        self.ghost_key = None
+        sprites = self.sprites
+        self.stack_surface.fill(BLACK)
+        self.stack_surface.blits([(sprites[cell - 1], (x * BLOCK_SIZE, y * BLOCK_SIZE))
+                                  for y, row in enumerate(self.engine.board.colors)
+                                  for x, cell in enumerate(row) if cell], doreturn=False)
+
+    def piece_blits(self, piece, rotation, px, py, sprites=None):
+        sprite = (sprites or self.sprites)[piece]
+        return [(sprite, ((px + x) * BLOCK_SIZE, (py + y) * BLOCK_SIZE))
+                for x, y in CELLS[piece][rotation]]
+
+    def update_stack(self):
+        # a lock without clears only adds the piece's own four cells
+        piece, rotation, x, y, cleared = self.engine.last_lock
+        if cleared:
+            self.rebuild_stack()
+        else:
+            self.stack_surface.blits(self.piece_blits(piece, rotation, x, y), doreturn=False)
 
     def draw_grid(self):
-        for y, row in enumerate(self.grid):
-            for x, cell in enumerate(row):
-                if cell:
-                    pygame.draw.rect(
-                        self.screen, cell, (x * BLOCK_SIZE, y * BLOCK_SIZE, BLOCK_SIZE - 1, BLOCK_SIZE - 1))
-
-    def draw_piece(self, piece):
-        for y, row in enumerate(piece['shape']):
-            for x, cell in enumerate(row):
-                if cell:
-                    pygame.draw.rect(self.screen, piece['color'],
-                                     ((piece['x'] + x) * BLOCK_SIZE, (piece['y'] + y) * BLOCK_SIZE, BLOCK_SIZE - 1, BLOCK_SIZE - 1))
-
-    def move(self, dx, dy):
-        new_x = self.current_piece['x'] + dx
-        new_y = self.current_piece['y'] + dy
-        if self.valid_move(self.current_piece['shape'], new_x, new_y):
-            self.current_piece['x'] = new_x
-            self.current_piece['y'] = new_y
-            return True
-        return False
-
-    def rotate(self):
-        new_shape = list(zip(*self.current_piece['shape'][::-1]))
-        if self.valid_move(new_shape, self.current_piece['x'], self.current_piece['y']):
-            self.current_piece['shape'] = new_shape
-
-    def valid_move(self, shape, x, y):
-        for y_offset, row in enumerate(shape):
-            for x_offset, cell in enumerate(row):
-                if cell:
-                    if (x + x_offset < 0 or x + x_offset >= GRID_WIDTH or
-                        y + y_offset >= GRID_HEIGHT or
-                            (y + y_offset >= 0 and self.grid[y + y_offset][x + x_offset])):
-                        return False
-        return True
-
-    def lock_piece(self):
-        for y, row in enumerate(self.current_piece['shape']):
-            for x, cell in enumerate(row):
-                if cell:
-                    self.grid[self.current_piece['y'] +
-                              y][self.current_piece['x'] + x] = self.current_piece['color']
-        self.score += 1  # Increment score by 1 for each placed piece
-        self.clear_lines()
-        self.current_piece = self.new_piece()
-        if not self.valid_move(self.current_piece['shape'], self.current_piece['x'], self.current_piece['y']):
-            self.game_over = True
-
-    def clear_lines(self):
-        lines_cleared = 0
-        for y in range(GRID_HEIGHT - 1, -1, -1):
-            if all(self.grid[y]):
-                del self.grid[y]
-                self.grid.insert(0, [0 for _ in range(GRID_WIDTH)])
-                lines_cleared += 1
-        self.score += lines_cleared ** 2 * 100
-
-    def draw_score(self):
-        font = pygame.font.Font(None, 36)
-        score_text = font.render(f"Score: {self.score}", True, WHITE)
-        high_score_text = font.render(
+        self.screen.blit(self.stack_surface, (0, 0))
+
+    def landing_y(self):
+        engine = self.engine
+        key = (engine.pieces, engine.piece, engine.rotation, engine.x)
+        if key != self.ghost_key:
+            self.ghost_key = key
+            self.ghost_y = engine.y + engine.drop_distance()
+        return self.ghost_y
+
+    def draw_ghost(self):
+        engine = self.engine
+        if not self.ghost or engine.game_over:
+            return
+        y = self.landing_y()
+        if y > engine.y:
+            self.screen.blits(self.piece_blits(engine.piece, engine.rotation, engine.x, y,
+                                               self.ghost_sprites), doreturn=False)
+
+    def draw_piece(self):
+        engine = self.engine
+        self.screen.blits(self.piece_blits(engine.piece, engine.rotation, engine.x, engine.y),
+                          doreturn=False)
+
+    def step(self, action):
+        # every engine action goes through here to keep the stack cache in sync
+        result = self.engine.step(action)
+        if result == LOCKED:
+            self.update_stack()
+            if self.start_time is not None:
+                # the score only changes on a lock; the table is written in
+                # the background when this game gets into it or moves up
+                engine = self.engine
+                self.scores.update(engine.score, engine.lines, engine.pieces)
+                self.high_score = max(self.high_score, engine.score)
+        if result != NOTHING and self.recorder and self.start_time is not None:
+            self.recorder.record(action, int((time.perf_counter() - self.start_time) * 1000))
+        return result
+
+    def save_replay(self):
+        if not self.recorder or not self.recorder.count:
+            return None
+        name = time.strftime("tetris-%Y%m%d-%H%M%S")
+        path = os.path.join(REPLAY_DIR, name + ".trp")
+        number = 1
+        while os.path.exists(path):
+            number += 1
+            path = os.path.join(REPLAY_DIR, f"{name}-{number}.trp")
+        self.replay_path = self.recorder.save(path)
+        # only now that the file exists may the high score table point to it
+        self.scores.set_replay(self.replay_path)
+        return self.replay_path
+
+    def render_score_panel(self):
+        score_text = self.font.render(f"Score: {self.engine.score}", True, WHITE)
+        high_score_text = self.font.render(
             f"High Score: {self.high_score}", True, WHITE)
 
         # Create a background rectangle for the score display
-        score_bg = pygame.Surface((BLOCK_SIZE * 7, BLOCK_SIZE * 4))
-        score_bg.fill(BLACK)
-        score_bg.set_alpha(200)  # Semi-transparent background
+        panel = pygame.Surface((BLOCK_SIZE * 7, BLOCK_SIZE * 4)).convert()
+        panel.fill(BLACK)
+        panel.blit(score_text, (10, 10))
+        panel.blit(high_score_text, (10, 50))
+        return panel
+
+    def draw_score(self):
+        # only re-render the text when the numbers change
+        key = (self.engine.score, self.high_score)
+        if key != self.score_panel_key:
+            self.score_panel = self.render_score_panel()
+            self.score_panel_key = key
 
         # Position the score display
         score_x = BLOCK_SIZE * (GRID_WIDTH + 0.5)
         score_y = BLOCK_SIZE * 2
-
-        # Draw the background and text
-        self.screen.blit(score_bg, (score_x, score_y))
-        self.screen.blit(score_text, (score_x + 10, score_y + 10))
-        self.screen.blit(high_score_text, (score_x + 10, score_y + 50))
+        self.screen.blit(self.score_panel, (score_x, score_y))
+
+    def draw_mini_piece(self, surface, piece, x, y):
+        sprite = self.preview_sprites[piece]
+        rotation = SPAWN_ROTATION[piece]
+        left, top = MIN_DX[piece][rotation], MIN_DY[piece][rotation]
+        surface.blits([(sprite, (x + (cx - left) * PREVIEW_BLOCK, y + (cy - top) * PREVIEW_BLOCK))
+                       for cx, cy in CELLS[piece][rotation]], doreturn=False)
+
+    def render_queue_panel(self):
+        engine = self.engine
+        panel = pygame.Surface((BLOCK_SIZE * 7, BLOCK_SIZE * 12)).convert()
+        panel.fill(BLACK)
+        panel.blit(self.font.render("Next", True, WHITE), (10, 0))
+        for i, piece in enumerate(engine.next_pieces):
+            self.draw_mini_piece(panel, piece, 20, 30 + i * 3 * PREVIEW_BLOCK)
+        hold_y = 40 + MAX_PREVIEW * 3 * PREVIEW_BLOCK
+        panel.blit(self.font.render("Hold", True, WHITE), (10, hold_y))
+        if engine.hold_piece is not None:
+            self.draw_mini_piece(panel, engine.hold_piece, 20, hold_y + 30)
+        return panel
+
+    def draw_queue(self):
+        # the queue only changes on a new piece or a hold
+        key = (tuple(self.engine.next_pieces), self.engine.hold_piece)
+        if key != self.queue_panel_key:
+            self.queue_panel = self.render_queue_panel()
+            self.queue_panel_key = key
+        self.screen.blit(self.queue_panel, (BLOCK_SIZE * (GRID_WIDTH + 0.5), BLOCK_SIZE * 7))
 
     def load_high_score(self):
-        if os.path.exists('high_score.pkl'):
-            with open('high_score.pkl', 'rb') as f:
-                return pickle.load(f)
-        return 0
+        return self.scores.best()
 
     def save_high_score(self):
-        with open('high_score.pkl', 'wb') as f:
-            pickle.dump(max(self.score, self.high_score), f)
+        # the table is already up to date; wait for the last write
+        self.scores.close()
+
+    def handle_event(self, event):
+        # returns True when the event changed what is on screen
+        if event.type == pygame.QUIT:
+            self.game_over = True
+        elif event.type == pygame.KEYDOWN and event.key in KEY_ACTIONS and not self.ai_player:
+            return self.controller.press(KEY_ACTIONS[event.key])
+        elif event.type == pygame.KEYUP and event.key in KEY_ACTIONS:
+            self.controller.release(KEY_ACTIONS[event.key])
+        elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            return True
+        return False
+
+    def report_cpu(self, wall_start, cpu_start):
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        if wall > 0:
+            print(f"CPU usage: {100 * cpu / wall:.1f}% of one core over {wall:.1f} s")
+
+    def report_latency(self):
+        if not self.latencies:
+            return
+        for label, values in (("event read -> flip", [a for a, _ in self.latencies]),
+                              ("poll -> flip (upper bound, with queue wait)",
+                               [b for _, b in self.latencies])):
+            values = sorted(values)
+            print(f"input to screen, {label}: {len(values)} inputs, "
+                  f"mean {1000 * sum(values) / len(values):.2f} ms, "
+                  f"p50 {1000 * values[len(values) // 2]:.2f} ms, "
+                  f"p95 {1000 * values[int(len(values) * 0.95)]:.2f} ms, "
+                  f"max {1000 * values[-1]:.2f} ms")
 
     def run(self):
         # Mostrar la pantalla de presentación antes de iniciar el juego
         self.pantalla_presentacion()
-        fall_time = 0
-        fall_speed = 0.5
-        while not self.game_over:
-            fall_time += self.clock.get_rawtime()
-            self.clock.tick()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.game_over = True
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_LEFT:
-                        self.move(-1, 0)
-                    elif event.key == pygame.K_RIGHT:
-                        self.move(1, 0)
-                    elif event.key == pygame.K_DOWN:
-                        self.move(0, 1)
-                    elif event.key == pygame.K_UP:
-                        self.rotate()
-
-            if fall_time / 1000 > fall_speed:
-                if not self.move(0, 1):
-                    self.lock_piece()
-                fall_time = 0
-
-            self.screen.fill(BLACK)
-            self.draw_grid()
-            self.draw_piece(self.current_piece)
-            self.draw_score()
-            pygame.display.flip()
-
-        self.save_high_score()
+        last_time = time.perf_counter()
+        self.start_time = last_time
+        self.scores.start_game(seed=self.engine.seed, ai=self.ai)
+        wall_start, cpu_start = last_time, time.process_time()
+        try:
+            self.loop(last_time, wall_start, cpu_start)
+        finally:
+            # also after a crash: the replay and the scores are not lost
+            self.save_replay()
+            self.save_high_score()
         pygame.quit()
 
+    def loop(self, last_time, wall_start, cpu_start):
+        report_time = last_time + 5
+        ai_time = 0.0
+        frame_time = 1 / self.fps
+        next_frame = last_time
+        last_poll = last_time
+        pending = []  # (read, polled) times of inputs not on screen yet
+        dirty = True
+        while not self.game_over and not self.engine.game_over:
+            events = pygame.event.get()
+            now = time.perf_counter()
+            polled = last_poll
+            if not events:
+                # sleep until a key arrives, a timer is due or the next
+                # frame may be drawn
+                due = self.controller.next_due() / LOGIC_HZ
+                if self.ai_player:
+                    due = min(due, AI_STEP - ai_time)
+                if dirty:
+                    due = min(due, next_frame - now)
+                wait_ms = int(due * 1000)
+                if wait_ms > 0:
+                    event = pygame.event.wait(wait_ms)
+                    now = time.perf_counter()
+                    polled = now  # we were waiting, so it arrived just now
+                    if event.type != pygame.NOEVENT:
+                        events = [event]
+            last_poll = now
+
+            for event in events:
+                if self.handle_event(event):
+                    dirty = True
+                    if self.latency and event.type == pygame.KEYDOWN:
+                        pending.append((now, polled))
+
+            # gravity, auto-repeat and lock delay run on the monotonic clock
+            # in fractional 60 Hz frames, whatever the frame rate is
+            if self.controller.advance((now - last_time) * LOGIC_HZ):
+                dirty = True
+            if self.ai_player:
+                ai_time += now - last_time
+                if ai_time >= AI_STEP:
+                    ai_time = 0.0
+                    self.controller.act(self.ai_player.next_action())
+                    dirty = True
+            last_time = now
+
+            # cap the redraw rate without blocking on input
+            if dirty and now >= next_frame:
+                self.screen.fill(BLACK)
+                self.draw_grid()
+                self.draw_ghost()
+                self.draw_piece()
+                self.draw_score()
+                self.draw_queue()
+                pygame.display.flip()
+                dirty = False
+                shown = time.perf_counter()
+                next_frame = shown + frame_time
+                for read, polled in pending:
+                    self.latencies.append((shown - read, shown - polled))
+                pending = []
+
+            if self.cpu_report and now >= report_time:
+                self.report_cpu(wall_start, cpu_start)
+                report_time = now + 5
+
+        self.report_cpu(wall_start, cpu_start)
+        self.report_latency()
+
 
 if __name__ == "__main__":
-    game = Tetris()
+    parser = argparse.ArgumentParser(description="Tetris by IanThePlug")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help=f"frame cap (default: {FPS})")
+    parser.add_argument("--cpu-report", action="store_true",
+                        help="print the CPU usage every 5 seconds")
+    parser.add_argument("--ai", nargs="?", const="greedy", choices=["greedy", "search"],
+                        help="let the AI play: one-piece placement (ai.py) or "
+                             "lookahead over the next piece (search.py)")
+    parser.add_argument("--seed", type=int, help="same seed, same pieces")
+    parser.add_argument("--randomizer", choices=MODES, default="bag",
+                        help="7-bag, NES-style classic or plain random pieces")
+    parser.add_argument("--preview", type=int, default=PREVIEW,
+                        help=f"next pieces shown (0-{MAX_PREVIEW})")
+    parser.add_argument("--das", type=float, default=DAS, help="frames before auto-repeat")
+    parser.add_argument("--arr", type=float, default=ARR, help="frames between repeats (0 = instant)")
+    parser.add_argument("--gravity", type=float, default=GRAVITY_FRAMES, help="frames per row")
+    parser.add_argument("--soft-drop", type=float, default=SOFT_DROP,
+                        help="frames per row while soft dropping")
+    parser.add_argument("--lock-delay", type=float, default=LOCK_DELAY, help="frames on the ground")
+    parser.add_argument("--latency", action="store_true",
+                        help="measure the time from a key press to the frame showing it")
+    parser.add_argument("--no-replay", action="store_true",
+                        help=f"do not save the game to {REPLAY_DIR}")
+    parser.add_argument("--no-ghost", action="store_true",
+                        help="do not show where the piece will land")
+    args = parser.parse_args()
+    handling = {"das": args.das, "arr": args.arr, "gravity": args.gravity,
+                "soft_drop": args.soft_drop, "lock_delay": args.lock_delay}
+    game = Tetris(fps=args.fps, cpu_report=args.cpu_report, ai=args.ai, seed=args.seed,
+                  mode=args.randomizer, preview=args.preview, handling=handling,
+                  latency=args.latency, record=not args.no_replay, ghost=not args.no_ghost)
     game.run()